@@ -0,0 +1,70 @@
+import asyncio
+import json
+import os
+import uuid
+
+import aiofiles
+import aiofiles.os
+
+async def write_text(path, content: str):
+    """异步写入文本文件（先写临时文件再改名，读者不会看到写了一半的文件）"""
+    path = str(path)
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    async with aiofiles.open(temp_path, 'w', encoding='utf-8') as f:
+        await f.write(content)
+    await aiofiles.os.replace(temp_path, path)
+
+async def write_bytes(path, data: bytes):
+    """异步写入二进制文件（截图、图块等）"""
+    async with aiofiles.open(str(path), 'wb') as f:
+        await f.write(data)
+
+async def write_json(path, data, indent: int = 2):
+    """异步写入 JSON；大报告的序列化也放到线程池中，不阻塞事件循环"""
+    content = await asyncio.to_thread(json.dumps, data, indent=indent, ensure_ascii=False)
+    await write_text(path, content)
+
+class BatchedWriter:
+    """批量追加写入
+
+    append() 只把行放入缓冲区；缓冲达到 max_lines 或距首条未写入记录超过 flush_interval 秒时，
+    一次性写入文件，减少频繁小写入。进程退出前需调用 close() 写出剩余内容。
+    """
+
+    def __init__(self, path, max_lines: int = 50, flush_interval: float = 1.0):
+        self.path = str(path)
+        self.max_lines = max_lines
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._lock = asyncio.Lock()
+        self._timer = None
+
+    async def append(self, line: str):
+        self._pending.append(line if line.endswith("\n") else line + "\n")
+        if len(self._pending) >= self.max_lines:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        # close() 取消定时任务时不能打断正在进行的写入
+        await asyncio.shield(self.flush())
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            lines, self._pending = self._pending, []
+            directory = os.path.dirname(self.path)
+            if directory:
+                await aiofiles.os.makedirs(directory, exist_ok=True)
+            async with aiofiles.open(self.path, 'a', encoding='utf-8') as f:
+                await f.write("".join(lines))
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
@@ -3,132 +3,67 @@
 批量截图工具 - 优化版
 每次运行创建独立的时间目录，支持多种URL列表
 """
+import argparse
 import asyncio
 import sys
 import os
 import time
-import json
 from datetime import datetime
 from pathlib import Path
 
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# 预定义的URL集合
+from async_io import write_json, write_text
+from checkpoint import CheckpointJournal, resolve_session_dir
+from target_registry import default_registry
+from thumbnails import drop_missing_previews, report_thumbnail_html
+
+# 预定义的URL集合（按标签从目标清单 targets.json 中选取）
 URL_SETS = {
     "key_sites": {
-        "name": "关键网站 (5个)",
+        "name": "关键网站",
         "description": "从12文件夹提取的最重要网站",
-        "urls": [
-            {"name": "Wave Life Sciences", "url": "https://wavelifesciences.com/pipeline/research-and-development/"},
-            {"name": "Silence Therapeutics", "url": "https://silence-therapeutics.com/our-pipeline/default.aspx"},
-            {"name": "Alnylam", "url": "https://www.alnylam.com/alnylam-rnai-pipeline"},
-            {"name": "Arrowhead Pharma", "url": "https://arrowheadpharma.com/pipeline/"},
-            {"name": "CRISPR Therapeutics", "url": "https://crisprtx.com/pipeline"}
-        ]
+        "tags": ["key"]
     },
     "rnai_companies": {
-        "name": "RNAi公司 (10个)",
+        "name": "RNAi公司",
         "description": "专注RNAi技术的生物技术公司",
-        "urls": [
-            {"name": "Alnylam", "url": "https://www.alnylam.com/alnylam-rnai-pipeline"},
-            {"name": "Arrowhead Pharma", "url": "https://arrowheadpharma.com/pipeline/"},
-            {"name": "Silence Therapeutics", "url": "https://silence-therapeutics.com/our-pipeline/default.aspx"},
-            {"name": "Dicerna (Novo Nordisk)", "url": "https://www.novonordisk.com/science-and-technology/r-d-pipeline.html"},
-            {"name": "SiRNA Omics", "url": "https://www.sirnaomics.com/cn/science-pipeline/pipeline/"},
-            {"name": "Ionis", "url": "https://ionis.com/pipeline/independent?_format=json"},
-            {"name": "Wave Life Sciences", "url": "https://wavelifesciences.com/pipeline/research-and-development/"},
-            {"name": "Roche (RNAi)", "url": "https://www.roche.com/solutions/pipeline"},
-            {"name": "Sarepta", "url": "https://www.sarepta.com/products-pipeline/pipelinel"},
-            {"name": "ProQR", "url": "https://www.proqr.com/pipeline"}
-        ]
+        "tags": ["rnai"]
     },
     "gene_editing": {
-        "name": "基因编辑公司 (8个)",
+        "name": "基因编辑公司",
         "description": "CRISPR和其他基因编辑技术公司",
-        "urls": [
-            {"name": "CRISPR Therapeutics", "url": "https://crisprtx.com/pipeline"},
-            {"name": "Intellia Therapeutics", "url": "https://www.intelliatx.com/pipeline/"},
-            {"name": "Beam Therapeutics", "url": "https://beamtx.com/pipeline/"},
-            {"name": "Metagenomi", "url": "https://metagenomi.co/pipeline"},
-            {"name": "Dyne Therapeutics", "url": "https://www.dyne-tx.com/pipeline/"},
-            {"name": "PepGen", "url": "https://www.pepgen.com/pipeline/"},
-            {"name": "Entrada Therapeutics", "url": "https://www.entradatx.com/pipeline"},
-            {"name": "Avidity Biosciences", "url": "https://www.aviditybiosciences.com/pipeline/pipeline-overview"}
-        ]
+        "tags": ["gene_editing"]
     },
     "big_pharma": {
-        "name": "大型制药公司 (6个)",
+        "name": "大型制药公司",
         "description": "传统大型制药公司的管线",
-        "urls": [
-            {"name": "Novartis", "url": "https://www.novartis.com/research-development/novartis-pipeline"},
-            {"name": "Roche", "url": "https://www.roche.com/solutions/pipeline"},
-            {"name": "AstraZeneca", "url": "https://www.astrazeneca.com/our-therapy-areas/pipeline.html"},
-            {"name": "Lilly", "url": "https://www.lilly.com/innovation/clinical-development-pipeline"},
-            {"name": "Novo Nordisk", "url": "https://www.novonordisk.com/science-and-technology/r-d-pipeline.html"},
-            {"name": "Regeneron", "url": "https://www.regeneron.com/science/investigational-pipeline"}
-        ]
+        "tags": ["big_pharma"]
     },
     "all_sites": {
-        "name": "所有网站 (44个)",
+        "name": "所有网站",
         "description": "12文件夹中的所有网站",
-        "urls": []  # 将在运行时填充
+        "tags": ["folder_12"]
     }
 }
 
-# 填充所有网站列表
-def populate_all_sites():
-    """填充所有网站列表"""
-    all_urls = []
-    
-    # 添加所有其他集合的URL，去重
-    seen_urls = set()
-    for set_key, url_set in URL_SETS.items():
-        if set_key != "all_sites":
-            for url_info in url_set["urls"]:
-                if url_info["url"] not in seen_urls:
-                    all_urls.append(url_info)
-                    seen_urls.add(url_info["url"])
-    
-    # 添加其他未包含的URL
-    additional_urls = [
-        {"name": "Denali Therapeutics", "url": "https://www.denalitherapeutics.com/pipeline"},
-        {"name": "Adarx", "url": "https://www.adarx.com/pipeline/"},
-        {"name": "Ribolia", "url": "https://www.ribolia.com/pipeline"},
-        {"name": "Atalanta Therapeutics", "url": "https://www.atalantatx.com/pipeline/"},
-        {"name": "Rona Therapeutics", "url": "https://www.ronatherapeutics.com/pipeline"},
-        {"name": "Olix Pharma", "url": "https://olixpharma.com/rnd/rnd03.php"},
-        {"name": "Tangram Therapeutics", "url": "https://tangramtx.com/pipeline/"},
-        {"name": "Switch Therapeutics", "url": "https://www.switchthera.com/our-science/"},
-        {"name": "Arobic Therapeutics", "url": "https://www.arobiotx.com/pipeline"},
-        {"name": "Sanegene Bio", "url": "https://www.sanegenebio.com/pipeline/"},
-        {"name": "Sirius RNA", "url": "https://www.siriusrna.com/pipeline/index.html#pipeline"},
-        {"name": "Synerk", "url": "https://synerk.cn/productinfo/883480.html"},
-        {"name": "Aligos", "url": "https://aligos.com/science/scientific-overview/"},
-        {"name": "Arbutus Bio", "url": "https://www.arbutusbio.com/pipeline/"},
-        {"name": "Camp4 Therapeutics", "url": "https://www.camp4tx.com/pipeline/"},
-        {"name": "Mina Therapeutics", "url": "https://minatx.com/pipeline/"},
-        {"name": "Ractigen", "url": "https://www.ractigen.com/pipeline/"},
-        {"name": "Judo Bio", "url": "https://judo.bio/pipeline/"},
-        {"name": "Rigerna", "url": "https://www.rigerna.com/page/cpgx/"},
-        {"name": "Siran Bio", "url": "https://www.siranbio.com/page/cpgx/"},
-        {"name": "VisiRNA", "url": "https://www.visirna.com/pages/client/pplinea?version=v1"},
-        {"name": "Hygeia Pharma", "url": "https://www.hygieiapharma.com/Pipeline/3.html"}
-    ]
-    
-    for url_info in additional_urls:
-        if url_info["url"] not in seen_urls:
-            all_urls.append(url_info)
-            seen_urls.add(url_info["url"])
-    
-    URL_SETS["all_sites"]["urls"] = all_urls
+def url_set_targets(url_set_key) -> list:
+    """URL集合对应的目标（优先级高的在前）"""
+    return default_registry().query(tags=URL_SETS[url_set_key]["tags"], by_priority=True)
 
 class BatchScreenshotManager:
-    def __init__(self):
-        self.session_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def __init__(self, resume: str = None):
         self.base_dir = Path("screenshots")
-        self.session_dir = self.base_dir / f"batch_{self.session_time}"
+        if resume:
+            # 恢复中断的会话：沿用原目录，已成功的URL不再截图
+            self.session_dir = resolve_session_dir(resume, self.base_dir, "batch")
+            self.session_time = self.session_dir.name.replace("batch_", "", 1)
+        else:
+            self.session_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.session_dir = self.base_dir / f"batch_{self.session_time}"
         self.session_dir.mkdir(parents=True, exist_ok=True)
+        self.journal = CheckpointJournal(self.session_dir)
         
         # 创建子目录
         self.images_dir = self.session_dir / "images"
@@ -140,6 +75,10 @@ class BatchScreenshotManager:
         print(f"🖼️ 截图保存目录: {self.images_dir}")
         print(f"📊 报告保存目录: {self.reports_dir}")
     
+    async def resumed_url_set(self) -> str:
+        """恢复会话时沿用的URL集合"""
+        return (await self.journal.read_meta()).get("url_set")
+    
     async def run_batch_screenshot(self, url_set_key):
         """运行批量截图"""
         if url_set_key not in URL_SETS:
@@ -147,7 +86,7 @@ class BatchScreenshotManager:
             return
         
         url_set = URL_SETS[url_set_key]
-        urls = url_set["urls"]
+        urls = url_set_targets(url_set_key)
         
         print(f"\n🚀 开始批量截图: {url_set['name']}")
         print(f"📋 描述: {url_set['description']}")
@@ -160,13 +99,14 @@ class BatchScreenshotManager:
             # 创建截图服务，使用我们的图片目录
             service = ScreenshotService(str(self.images_dir))
             
-            # 验证服务
+            # 验证服务：渲染内联页面，同时预热浏览器池
             print("\n🧪 验证截图服务...")
-            test_result = await service.take_screenshot("https://httpbin.org/html")
-            if not test_result.get("success"):
-                print(f"❌ 服务验证失败: {test_result.get('error')}")
+            probe = await service.probe()
+            if not probe.get("success"):
+                print(f"❌ 服务验证失败: {probe.get('error')}")
+                await service.close()
                 return
-            print("✅ 服务验证成功")
+            print(f"✅ 服务验证成功 ({probe['elapsed_ms']}ms)")
             
         except Exception as e:
             print(f"❌ 服务初始化失败: {e}")
@@ -176,11 +116,21 @@ class BatchScreenshotManager:
         print(f"📸 开始截图任务")
         print(f"{'='*80}")
         
+        # 断点日志：已成功的URL直接复用结果
+        await self.journal.write_meta({"url_set": url_set_key})
+        completed = await self.journal.completed()
+        if completed:
+            resumed = sum(1 for url_info in urls if url_info["url"] in completed)
+            print(f"♻️ 恢复会话: {resumed} 个网站已成功，跳过；其余 {len(urls) - resumed} 个重新截图")
+        
         results = []
         start_time = time.time()
         
         for i, url_info in enumerate(urls, 1):
-            result = await self.screenshot_single_url(service, url_info, i, len(urls))
+            result = completed.get(url_info["url"])
+            if result is None:
+                result = await self.screenshot_single_url(service, url_info, i, len(urls))
+                await self.journal.append(result)
             results.append(result)
             
             # 进度显示
@@ -188,10 +138,15 @@ class BatchScreenshotManager:
             print(f"   📊 进度: {i}/{len(urls)} | 成功: {success_count} | 失败: {i - success_count}")
             
             # URL间隔
-            if i < len(urls):
+            if i < len(urls) and url_info["url"] not in completed:
                 await asyncio.sleep(1.5)
         
         total_time = time.time() - start_time
+        await self.journal.close()
+        
+        # 关闭浏览器池（等待缩略图生成完成）
+        await service.close()
+        await drop_missing_previews(results)
         
         # 生成报告
         await self.generate_report(url_set_key, url_set, results, total_time)
@@ -209,7 +164,8 @@ class BatchScreenshotManager:
         start_time = time.time()
         
         try:
-            result = await service.take_screenshot(url, {"headless": True})
+            # 目标清单中的站点参数覆盖默认值
+            result = await service.take_screenshot(url, {"headless": True, **url_info["options"]})
             elapsed = time.time() - start_time
             
             if result.get("success"):
@@ -220,6 +176,9 @@ class BatchScreenshotManager:
                     "url": url,
                     "success": True,
                     "filename": filename,
+                    "path": result.get("path"),
+                    "thumbnail": result.get("thumbnail"),
+                    "preview": result.get("preview"),
                     "elapsed": elapsed,
                     "timestamp": datetime.now().isoformat()
                 }
@@ -303,8 +262,7 @@ class BatchScreenshotManager:
         }
         
         json_report_file = self.reports_dir / f"report_{set_key}_{self.session_time}.json"
-        with open(json_report_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, indent=2, ensure_ascii=False)
+        await write_json(json_report_file, report_data)
         
         # 保存HTML报告
         html_report_file = self.reports_dir / f"report_{set_key}_{self.session_time}.html"
@@ -340,6 +298,8 @@ class BatchScreenshotManager:
         .site-name {{ font-weight: bold; margin-right: 10px; }}
         .site-url {{ color: #666; font-size: 12px; }}
         .elapsed-time {{ margin-left: auto; color: #666; }}
+        .thumbnail {{ width: 160px; height: 120px; object-fit: cover; margin-right: 12px; border: 1px solid #ddd; border-radius: 4px; }}
+        .full-link {{ font-size: 11px; margin-left: 10px; }}
         .error-msg {{ color: #dc3545; font-size: 12px; margin-left: 10px; }}
     </style>
 </head>
@@ -391,6 +351,7 @@ class BatchScreenshotManager:
             html_content += f"""
             <div class="result-item {css_class}">
                 <span class="status-icon">{icon}</span>
+                {report_thumbnail_html(result, str(html_file.parent)) if success else ''}
                 <div>
                     <div class="site-name">{i}. {result['name']}</div>
                     <div class="site-url">{result['url']}</div>
@@ -407,8 +368,7 @@ class BatchScreenshotManager:
 </html>
 """
         
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        await write_text(html_file, html_content)
 
 def show_menu():
     """显示菜单"""
@@ -420,15 +380,36 @@ def show_menu():
     for i, (key, url_set) in enumerate(URL_SETS.items(), 1):
         print(f"{i}. {url_set['name']}")
         print(f"   {url_set['description']}")
-        print(f"   网站数量: {len(url_set['urls'])}")
+        print(f"   网站数量: {len(url_set_targets(key))}")
         print()
     
     print("0. 退出")
     print("="*50)
 
+async def resume_session(session):
+    """恢复中断的会话：沿用原URL集合，只重试未成功的URL"""
+    try:
+        manager = BatchScreenshotManager(resume=session)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    
+    url_set_key = await manager.resumed_url_set()
+    if url_set_key not in URL_SETS:
+        print(f"❌ 会话中没有记录有效的URL集合: {url_set_key}")
+        return
+    
+    await manager.run_batch_screenshot(url_set_key)
+    print(f"\n🎉 批量截图完成!")
+
 async def main():
-    # 填充所有网站列表
-    populate_all_sites()
+    parser = argparse.ArgumentParser(description="批量截图工具")
+    parser.add_argument("--resume", metavar="SESSION", help="恢复中断的会话（目录路径、目录名或时间戳）")
+    args = parser.parse_args()
+    
+    if args.resume:
+        await resume_session(args.resume)
+        return
     
     while True:
         show_menu()
@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from async_io import BatchedWriter
+from screenshot_catalog import sha256_file
+
+# 会话清单文件名（每行一条 JSON 记录）
+MANIFEST_NAME = "manifest.jsonl"
+# 回收时跳过最近写入的文件（秒）
+GC_GRACE_SECONDS = 3600
+
+class BlobStore:
+    """内容寻址的截图存储
+
+    文件按内容 SHA-256 存放在 root/<前两位>/<三四位>/<哈希>.<扩展名>，字节相同的截图只存一份；
+    每个会话目录只保存一个轻量清单 manifest.jsonl，记录该会话的截图及其指向的文件，
+    列出会话内容时读取清单即可，无需扫描目录。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        # 各会话清单的批量写入器
+        self._manifests = {}
+
+    def blob_path(self, sha256: str, ext: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}{ext}")
+
+    async def put_bytes(self, data: bytes, ext: str) -> dict:
+        """写入图片字节，返回 {"path", "sha256", "size", "created"}（已存在时 created 为 False）"""
+        return await asyncio.to_thread(self._put_bytes, data, ext)
+
+    async def put_file(self, source_path: str, sha256: str = None) -> dict:
+        """把已写盘的文件移入存储（内容已存在时删除源文件）；已知哈希时可传入 sha256"""
+        return await asyncio.to_thread(self._put_file, source_path, sha256)
+
+    async def append_manifest(self, session_dir: str, entry: dict):
+        """追加清单记录（批量写入）"""
+        writer = self._manifests.get(session_dir)
+        if writer is None:
+            writer = self._manifests[session_dir] = BatchedWriter(os.path.join(session_dir, MANIFEST_NAME))
+        await writer.append(json.dumps(entry, ensure_ascii=False))
+
+    async def read_manifest(self, session_dir: str) -> list:
+        """读取会话清单（先写出缓冲中的记录），不存在时返回 None"""
+        writer = self._manifests.get(session_dir)
+        if writer is not None:
+            await writer.flush()
+        return await asyncio.to_thread(self._read_manifest, session_dir)
+
+    async def read_session(self, session_dir: str) -> list:
+        """读取会话目录及其子目录中的全部清单（批量脚本的清单在 <会话>/images/session_* 下），没有清单时返回 None"""
+        session_dir = os.path.realpath(session_dir)
+        for directory, writer in self._manifests.items():
+            directory = os.path.realpath(directory)
+            if directory == session_dir or directory.startswith(session_dir + os.sep):
+                await writer.flush()
+        return await asyncio.to_thread(self._read_session, session_dir)
+
+    async def flush(self):
+        """写出所有会话清单中缓冲的记录"""
+        for writer in self._manifests.values():
+            await writer.close()
+
+    def _put_bytes(self, data: bytes, ext: str) -> dict:
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(sha256, ext)
+        created = False
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，并发写入同一内容时不会读到半个文件
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            created = True
+        return {"path": path, "sha256": sha256, "size": len(data), "created": created}
+
+    def _put_file(self, source_path: str, sha256: str = None) -> dict:
+        sha256 = sha256 or sha256_file(source_path)
+        path = self.blob_path(sha256, os.path.splitext(source_path)[1])
+        size = os.path.getsize(source_path)
+        created = False
+        if os.path.exists(path):
+            os.remove(source_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(source_path, path)
+            created = True
+        return {"path": path, "sha256": sha256, "size": size, "created": created}
+
+    def _read_manifest(self, session_dir: str) -> list:
+        path = os.path.join(session_dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _read_session(self, session_dir: str) -> list:
+        root = os.path.realpath(self.root)
+        entries = None
+        for dirpath, dirnames, filenames in os.walk(session_dir):
+            dirnames[:] = sorted(d for d in dirnames if os.path.realpath(os.path.join(dirpath, d)) != root)
+            if MANIFEST_NAME in filenames:
+                entries = (entries or []) + self._read_manifest(dirpath)
+        return entries
+
+    def collect_garbage(self, manifest_root: str, grace_seconds: float = GC_GRACE_SECONDS) -> dict:
+        """删除没有任何会话清单引用的文件
+
+        变化检测判定未变化时，新截图改为引用上次的文件，本次写入的内容可能不再被引用；
+        同一内容也可能被其他截图共用，因此不在截图流程中删除，而是在这里按清单统一回收。
+        最近 grace_seconds 秒内写入的文件跳过，避免删除尚未记入清单的截图。
+        """
+        root = os.path.realpath(self.root)
+        referenced = set()
+        for dirpath, dirnames, filenames in os.walk(manifest_root):
+            dirnames[:] = [d for d in dirnames if os.path.realpath(os.path.join(dirpath, d)) != root]
+            if MANIFEST_NAME in filenames:
+                for entry in self._read_manifest(dirpath):
+                    if entry.get("path"):
+                        referenced.add(os.path.realpath(entry["path"]))
+
+        cutoff = time.time() - grace_seconds
+        removed = freed = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if path in referenced:
+                    continue
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    continue
+                os.remove(path)
+                removed += 1
+                freed += stat.st_size
+        return {"removed": removed, "freed_bytes": freed}
+
+def main():
+    parser = argparse.ArgumentParser(description="回收内容寻址存储中没有会话清单引用的文件")
+    parser.add_argument("root", nargs="?", default="screenshots", help="会话目录所在的根目录（默认 screenshots）")
+    parser.add_argument("--blobs", default=os.path.join("screenshots", "blobs"), help="存储目录（默认 screenshots/blobs）")
+    parser.add_argument("--grace", type=float, default=GC_GRACE_SECONDS, help="跳过最近多少秒内写入的文件")
+    args = parser.parse_args()
+
+    stats = BlobStore(args.blobs).collect_garbage(args.root, args.grace)
+    print(f"🧹 已删除 {stats['removed']} 个未引用文件，释放 {stats['freed_bytes'] / 1024 / 1024:.1f}MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from playwright.async_api import async_playwright
+
+class BrowserPool:
+    """长期存活的浏览器进程池
+
+    服务启动时拉起 N 个 Chromium 进程，之后每个请求只创建一个全新的
+    BrowserContext（隔离 cookie/缓存），用完即关闭，避免每次截图都付出进程启动开销。
+    崩溃的浏览器会在下一次分配或定时健康检查时自动重启。
+    """
+
+    def __init__(self, size: int = 2, headless: bool = True, launch_args: list = None,
+                 health_check_interval: float = 30):
+        self.size = max(1, size)
+        self.headless = headless
+        self.launch_args = launch_args or []
+        self.health_check_interval = health_check_interval
+
+        self.playwright = None
+        self.browsers = [None] * self.size
+        self.active_contexts = [0] * self.size
+        self.relaunch_count = 0
+        self.started = False
+        self.started_at = None
+
+        self._start_lock = asyncio.Lock()
+        self._slot_locks = [asyncio.Lock() for _ in range(self.size)]
+        self._health_task = None
+
+    async def start(self):
+        """启动 Playwright 和全部浏览器进程"""
+        async with self._start_lock:
+            if self.started:
+                return
+
+            self.playwright = await async_playwright().start()
+            for slot in range(self.size):
+                self.browsers[slot] = await self._launch(slot)
+
+            self.started = True
+            self.started_at = datetime.now().isoformat()
+            self._health_task = asyncio.create_task(self._health_loop())
+            print(f"✅ 浏览器池已启动: {self.size} 个浏览器进程")
+
+    async def stop(self):
+        """关闭全部浏览器进程和 Playwright"""
+        async with self._start_lock:
+            if not self.started:
+                return
+            self.started = False
+
+            if self._health_task:
+                self._health_task.cancel()
+                try:
+                    await self._health_task
+                except asyncio.CancelledError:
+                    pass
+                self._health_task = None
+
+            for slot, browser in enumerate(self.browsers):
+                if browser:
+                    try:
+                        await browser.close()
+                    except Exception as e:
+                        print(f"⚠️ 浏览器 #{slot} 关闭异常: {e}")
+                self.browsers[slot] = None
+
+            try:
+                await self.playwright.stop()
+            except Exception as e:
+                print(f"⚠️ Playwright 关闭异常: {e}")
+            self.playwright = None
+            print("✅ 浏览器池已关闭")
+
+    async def _launch(self, slot: int):
+        """在指定槽位启动一个浏览器进程"""
+        browser = await self.playwright.chromium.launch(
+            headless=self.headless,
+            args=self.launch_args
+        )
+        browser.on("disconnected", lambda b: self._on_disconnected(slot, b))
+        return browser
+
+    def _on_disconnected(self, slot: int, browser):
+        """浏览器进程崩溃或被关闭时标记槽位，等待重启"""
+        if self.started and self.browsers[slot] is browser:
+            print(f"⚠️ 浏览器 #{slot} 已断开，将自动重启")
+            self.browsers[slot] = None
+
+    async def _ensure_browser(self, slot: int):
+        """返回槽位上可用的浏览器，必要时重新启动"""
+        async with self._slot_locks[slot]:
+            browser = self.browsers[slot]
+            if browser is None or not browser.is_connected():
+                self.browsers[slot] = await self._launch(slot)
+                self.relaunch_count += 1
+                print(f"🔄 浏览器 #{slot} 已重启")
+            return self.browsers[slot]
+
+    def _pick_slot(self) -> int:
+        """选择当前活跃上下文最少的浏览器"""
+        return min(range(self.size), key=lambda slot: self.active_contexts[slot])
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        """从池中分配一个全新的 BrowserContext，退出时自动关闭"""
+        if not self.started:
+            await self.start()
+
+        slot = self._pick_slot()
+        self.active_contexts[slot] += 1
+        context = None
+        try:
+            browser = await self._ensure_browser(slot)
+            context = await browser.new_context(**context_options)
+            yield context
+        finally:
+            self.active_contexts[slot] -= 1
+            if context:
+                try:
+                    await context.close()
+                except Exception as e:
+                    print(f"⚠️ 上下文关闭异常: {e}")
+
+    async def health_check(self) -> dict:
+        """检查所有浏览器进程，重启已崩溃的进程"""
+        if not self.started:
+            return self.stats()
+
+        for slot in range(self.size):
+            try:
+                await self._ensure_browser(slot)
+            except Exception as e:
+                print(f"❌ 浏览器 #{slot} 重启失败: {e}")
+
+        return self.stats()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.health_check()
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "started_at": self.started_at,
+            "size": self.size,
+            "headless": self.headless,
+            "connected": sum(1 for b in self.browsers if b is not None and b.is_connected()),
+            "active_contexts": sum(self.active_contexts),
+            "relaunch_count": self.relaunch_count
+        }
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from image_encoding import Image
+from screenshot_cache import ScreenshotCache
+
+try:
+    from PIL import ImageDraw
+except ImportError:
+    ImageDraw = None
+
+# dHash 边长：每块 16x16 = 256 位
+HASH_SIZE = 16
+
+def page_hashes(path: str, mask: list = None, block_height: int = 1080) -> dict:
+    """按视口高度分块计算差异哈希（dHash）
+
+    整页压缩成一个哈希会丢失长页面下方的变化，分块后任一块变化都能被发现。
+    mask 为需要忽略的区域列表 [x, y, 宽, 高]（页面像素），哈希前涂成纯色，
+    用于排除轮播图、日期等动态内容。
+    """
+    Image.MAX_IMAGE_PIXELS = None
+    with Image.open(path) as image:
+        image = image.convert("L")
+        if mask:
+            draw = ImageDraw.Draw(image)
+            for x, y, w, h in mask:
+                draw.rectangle([x, y, x + w - 1, y + h - 1], fill=0)
+
+        width, height = image.size
+        hashes = []
+        for top in range(0, height, block_height):
+            block = image.crop((0, top, width, min(height, top + block_height)))
+            pixels = list(block.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).getdata())
+            bits = 0
+            for row in range(HASH_SIZE):
+                offset = row * (HASH_SIZE + 1)
+                for col in range(HASH_SIZE):
+                    bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+            hashes.append(f"{bits:0{HASH_SIZE * HASH_SIZE // 4}x}")
+    return {"width": width, "height": height, "hashes": hashes}
+
+def compare_hashes(previous: dict, current: dict, threshold: int = 10) -> dict:
+    """比较两次截图的分块哈希；尺寸不同或任一块汉明距离超过 threshold 视为变化"""
+    if (previous["width"], previous["height"]) != (current["width"], current["height"]):
+        return {
+            "changed": True,
+            "distance": None,
+            "changed_blocks": None,
+            "reason": f"尺寸变化 {previous['width']}x{previous['height']} -> {current['width']}x{current['height']}"
+        }
+
+    distances = [bin(int(a, 16) ^ int(b, 16)).count("1") for a, b in zip(previous["hashes"], current["hashes"])]
+    changed_blocks = [i for i, distance in enumerate(distances) if distance > threshold]
+    return {
+        "changed": bool(changed_blocks),
+        "distance": max(distances, default=0),
+        "changed_blocks": changed_blocks,
+        "reason": None
+    }
+
+class PageHashIndex:
+    """各 URL 最近一次截图的感知哈希（跨运行共享）
+
+    键为规范化URL；记录文件路径、内容 SHA-256、分块哈希和所用遮罩，
+    遮罩不同的记录不作为比较基准。
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    sha256 TEXT,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    hashes TEXT NOT NULL,
+                    mask TEXT,
+                    captured_at REAL NOT NULL
+                )
+            """)
+
+    @staticmethod
+    def _mask_key(mask: list) -> str:
+        return json.dumps(mask or [])
+
+    async def get(self, url: str, mask: list = None) -> dict:
+        """上一次截图的记录，没有或遮罩不同时返回 None"""
+        return await asyncio.to_thread(self._get, url, mask)
+
+    async def update(self, url: str, path: str, sha256: str, hashes: dict, mask: list = None):
+        await asyncio.to_thread(self._update, url, path, sha256, hashes, mask)
+
+    def _get(self, url: str, mask: list) -> dict:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT path, sha256, width, height, hashes, mask, captured_at FROM pages WHERE url = ?",
+                (ScreenshotCache.normalize_url(url),)
+            ).fetchone()
+        if row is None or row[5] != self._mask_key(mask):
+            return None
+        path, sha256, width, height, hashes, _, captured_at = row
+        return {
+            "path": path,
+            "sha256": sha256,
+            "width": width,
+            "height": height,
+            "hashes": json.loads(hashes),
+            "captured_at": captured_at
+        }
+
+    def _update(self, url: str, path: str, sha256: str, hashes: dict, mask: list):
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, path, sha256, width, height, hashes, mask, captured_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ScreenshotCache.normalize_url(url), path, sha256, hashes["width"], hashes["height"],
+                 json.dumps(hashes["hashes"]), self._mask_key(mask), time.time())
+            )
+
+def link_to_previous(previous_path: str, new_path: str) -> bool:
+    """用指向上一次截图的硬链接替换新文件，不再占用新的磁盘空间；失败时保留新文件"""
+    temp_path = new_path + ".link"
+    try:
+        os.link(previous_path, temp_path)
+    except OSError:
+        return False
+    os.replace(temp_path, new_path)
+    return True
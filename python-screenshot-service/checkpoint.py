@@ -0,0 +1,71 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+from async_io import BatchedWriter, write_json
+
+# 会话目录中的断点日志（每行一条截图结果）和运行参数
+CHECKPOINT_NAME = "checkpoint.jsonl"
+SESSION_META_NAME = "session.json"
+
+def resolve_session_dir(session: str, base_dir: Path, prefix: str) -> Path:
+    """把 --resume 参数解析为会话目录：可以是目录路径、目录名或时间戳（如 20250101_120000）"""
+    candidates = [Path(session), base_dir / session, base_dir / f"{prefix}_{session}"]
+    for candidate in candidates:
+        if (candidate / CHECKPOINT_NAME).exists():
+            return candidate
+    raise ValueError(f"找不到可恢复的会话: {session}（目录中需要有 {CHECKPOINT_NAME}）")
+
+class CheckpointJournal:
+    """批量截图断点日志
+
+    每完成一个URL就追加一行结果并立即落盘，运行中断后结果不会丢失；
+    --resume 时读取日志，已成功的URL直接复用结果，其余URL重新截图。
+    """
+
+    def __init__(self, session_dir):
+        self.path = os.path.join(str(session_dir), CHECKPOINT_NAME)
+        self.meta_path = os.path.join(str(session_dir), SESSION_META_NAME)
+        # 每条结果单独写出，崩溃时最多丢失正在截图的URL
+        self._writer = BatchedWriter(self.path, max_lines=1)
+
+    async def load(self) -> dict:
+        """读取已记录的结果，按URL返回最后一条记录"""
+        return await asyncio.to_thread(self._load)
+
+    def _load(self) -> dict:
+        results = {}
+        if not os.path.exists(self.path):
+            return results
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # 中断时可能留下写了一半的最后一行
+                    continue
+                results[result["url"]] = result
+        return results
+
+    async def completed(self) -> dict:
+        """已成功截图的URL及其结果"""
+        return {url: result for url, result in (await self.load()).items() if result.get("success")}
+
+    async def append(self, result: dict):
+        await self._writer.append(json.dumps(result, ensure_ascii=False))
+
+    async def write_meta(self, meta: dict):
+        """保存运行参数（如URL集合），恢复时沿用"""
+        await write_json(self.meta_path, meta)
+
+    async def read_meta(self) -> dict:
+        def read():
+            if not os.path.exists(self.meta_path):
+                return {}
+            with open(self.meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        return await asyncio.to_thread(read)
+
+    async def close(self):
+        await self._writer.close()
@@ -26,6 +26,11 @@ os.makedirs(SCREENSHOT_DIR, exist_ok=True)
 # 初始化截图服务
 screenshot_service = ScreenshotService(SCREENSHOT_DIR)
 
+@app.on_event("shutdown")
+async def shutdown():
+    """关闭常驻浏览器池，等待后台预览生成完成"""
+    await screenshot_service.close()
+
 class ScreenshotRequest(BaseModel):
     url: HttpUrl
     options: Optional[dict] = {}
@@ -97,16 +97,20 @@ async def test_direct_screenshot():
         
         service = ScreenshotService("./screenshots")
         
-        print("📸 直接调用截图服务...")
-        result = await service.take_screenshot(
-            "https://wavelifesciences.com/pipeline/research-and-development/",
-            {"headless": True}
-        )
-        
-        print(f"\n📄 直接调用结果:")
-        print(json.dumps(result, indent=2, ensure_ascii=False))
-        
-        return result
+        try:
+            print("📸 直接调用截图服务...")
+            result = await service.take_screenshot(
+                "https://wavelifesciences.com/pipeline/research-and-development/",
+                {"headless": True}
+            )
+            
+            print(f"\n📄 直接调用结果:")
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+            
+            return result
+        finally:
+            # 关闭浏览器池，等待后台预览生成完成
+            await service.close()
         
     except Exception as e:
         print(f"❌ 直接测试失败: {e}")
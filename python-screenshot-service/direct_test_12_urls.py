@@ -11,40 +11,16 @@ from datetime import datetime
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# 从12文件夹中提取的关键URL
-KEY_URLS = [
-    {
-        "name": "Wave Life Sciences",
-        "url": "https://wavelifesciences.com/pipeline/research-and-development/",
-        "note": "12文件夹Python代码成功抓取的网站"
-    },
-    {
-        "name": "Silence Therapeutics",
-        "url": "https://silence-therapeutics.com/our-pipeline/default.aspx",
-        "note": "可能有Cloudflare保护"
-    },
-    {
-        "name": "Alnylam",
-        "url": "https://www.alnylam.com/alnylam-rnai-pipeline",
-        "note": "RNAi领域知名公司"
-    },
-    {
-        "name": "Arrowhead Pharma",
-        "url": "https://arrowheadpharma.com/pipeline/",
-        "note": "RNAi治疗公司"
-    },
-    {
-        "name": "CRISPR Therapeutics",
-        "url": "https://crisprtx.com/pipeline",
-        "note": "基因编辑公司"
-    }
-]
+from target_registry import default_registry
+
+# 从12文件夹中提取的关键URL（目标清单中标记为 key 的网站）
+KEY_URLS = default_registry().query(tags=["key"])
 
 async def test_single_url(service, url_info, index, total):
     """测试单个URL"""
     name = url_info["name"]
     url = url_info["url"]
-    note = url_info["note"]
+    note = url_info["note"] or ""
     
     print(f"[{index}/{total}] 📸 {name}")
     print(f"         URL: {url}")
@@ -112,6 +88,7 @@ async def test_basic_functionality():
             return service
         else:
             print(f"❌ 简单URL测试失败: {simple_result.get('error')}")
+            await service.close()
             return None
             
     except Exception as e:
@@ -138,16 +115,20 @@ async def test_12_folder_urls():
     
     results = []
     
-    for i, url_info in enumerate(KEY_URLS, 1):
-        result = await test_single_url(service, url_info, i, len(KEY_URLS))
-        results.append(result)
-        
-        print()  # 空行分隔
-        
-        # 每个URL测试后等待2秒
-        if i < len(KEY_URLS):
-            print("⏳ 等待 2 秒...\n")
-            await asyncio.sleep(2)
+    try:
+        for i, url_info in enumerate(KEY_URLS, 1):
+            result = await test_single_url(service, url_info, i, len(KEY_URLS))
+            results.append(result)
+            
+            print()  # 空行分隔
+            
+            # 每个URL测试后等待2秒
+            if i < len(KEY_URLS):
+                print("⏳ 等待 2 秒...\n")
+                await asyncio.sleep(2)
+    finally:
+        # 关闭浏览器池，等待后台预览生成完成
+        await service.close()
     
     # 生成报告
     generate_report(results)
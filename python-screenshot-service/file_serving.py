@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from starlette.responses import Response
+
+# 读取文件/计算哈希时每次读取的字节数
+CHUNK_SIZE = 256 * 1024
+
+class ETagCache:
+    """文件内容哈希缓存
+
+    以 (路径, 大小, 修改时间) 为键，文件不变时不重复读取计算；
+    按最近最少使用淘汰，只保留 max_entries 条。
+    lookup(路径, 大小) 为异步函数，返回已知的内容哈希（如截图目录索引中记录的 SHA-256），
+    查不到时才读取整个文件计算。
+    """
+
+    def __init__(self, max_entries: int = 4096, lookup=None):
+        self.max_entries = max_entries
+        self.lookup = lookup
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def get(self, path: str, stat: os.stat_result) -> str:
+        """返回强 ETag（带引号的内容哈希）"""
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        sha256 = await self.lookup(path, stat.st_size) if self.lookup else None
+        if sha256 is None:
+            sha256 = await asyncio.to_thread(self.hash_file, path)
+        etag = f'"{sha256}"'
+        with self._lock:
+            self._entries[key] = etag
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+def parse_range(header: str, size: int):
+    """解析单个字节区间
+
+    返回 (start, end)（闭区间）；没有或无法处理的 Range（多区间、非 bytes 单位）返回 None，
+    按完整文件响应；区间无法满足时抛出 ValueError。
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+
+    start, sep, end = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        if start == "":
+            # bytes=-N：最后 N 个字节
+            length = int(end)
+            if length <= 0:
+                raise ValueError(header)
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        raise ValueError(header)
+
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 是否命中（支持多个值和 *）"""
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+class RangeFileResponse(Response):
+    """按区间流式发送文件
+
+    ASGI 服务器声明 http.response.zerocopy 扩展时交给服务器 sendfile 零拷贝发送；
+    否则（如 uvicorn）分块读取发送，内存中只保留一块数据。
+    """
+
+    def __init__(self, path: str, start: int, end: int, status_code: int = 200,
+                 headers: dict = None, media_type: str = None):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = end - start + 1
+        self.headers["content-length"] = str(self.length)
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers
+        })
+        if scope.get("method") == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        f = await asyncio.to_thread(open, self.path, 'rb')
+        try:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False
+                })
+                return
+
+            await asyncio.to_thread(f.seek, self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 文件在发送过程中被截断
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await asyncio.to_thread(f.close)
+
+async def serve_file(path: str, media_type: str, request_headers, etag_cache: ETagCache) -> Response:
+    """按请求头返回 304 / 206 / 416 / 200 响应"""
+    stat = await asyncio.to_thread(os.stat, path)
+    etag = await etag_cache.get(path, stat)
+    headers = {
+        "etag": etag,
+        "accept-ranges": "bytes",
+        "cache-control": "no-cache"
+    }
+
+    if etag_matches(request_headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = stat.st_size
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_header and if_range and if_range.strip() != etag:
+        # 文件已变化，忽略 Range 返回完整内容
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        headers["content-range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        return RangeFileResponse(path, 0, size - 1, headers=headers, media_type=media_type)
+
+    start, end = byte_range
+    headers["content-range"] = f"bytes {start}-{end}/{size}"
+    return RangeFileResponse(path, start, end, status_code=206, headers=headers, media_type=media_type)
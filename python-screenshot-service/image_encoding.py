@@ -0,0 +1,64 @@
+from io import BytesIO
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    # 旧版 Pillow 通过插件支持 AVIF
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# 支持的输出格式: MIME 类型和扩展名
+IMAGE_FORMATS = {
+    "png": {"media_type": "image/png", "ext": ".png"},
+    "jpeg": {"media_type": "image/jpeg", "ext": ".jpg"},
+    "webp": {"media_type": "image/webp", "ext": ".webp"},
+    "avif": {"media_type": "image/avif", "ext": ".avif"}
+}
+
+# 各格式重新编码所需的依赖（Pillow 10 没有内置 AVIF 编码器，由 pillow-avif-plugin 提供）
+FORMAT_REQUIREMENTS = {
+    "webp": "Pillow",
+    "avif": "Pillow 和 pillow-avif-plugin"
+}
+
+# WebP 单边最大像素
+WEBP_MAX_DIMENSION = 16383
+
+def normalize_format(fmt: str) -> str:
+    fmt = (fmt or "png").lower()
+    return "jpeg" if fmt == "jpg" else fmt
+
+def format_available(fmt: str) -> bool:
+    """PNG 始终可用；JPEG 可退回浏览器原生编码；WebP/AVIF 需要 Pillow 对应的编码器"""
+    if fmt in ("png", "jpeg"):
+        return True
+    if fmt not in IMAGE_FORMATS or Image is None:
+        return False
+    Image.init()
+    return IMAGE_FORMATS[fmt]["ext"] in Image.registered_extensions()
+
+def encode_image(png_bytes: bytes, fmt: str, quality: int = 80) -> bytes:
+    """将 PNG 截图重新编码为目标格式（CPU 密集，应在线程池中调用）"""
+    if fmt == "png":
+        return png_bytes
+    if Image is None:
+        raise RuntimeError(f"{fmt} 格式需要安装 {FORMAT_REQUIREMENTS.get(fmt, 'Pillow')}")
+
+    with Image.open(BytesIO(png_bytes)) as image:
+        if fmt == "webp" and image.height > WEBP_MAX_DIMENSION:
+            raise ValueError(f"WebP 最大支持 {WEBP_MAX_DIMENSION}px 高度，当前 {image.height}px，请设置 max_height")
+        if fmt == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+
+        output = BytesIO()
+        save_options = {"quality": quality}
+        if fmt == "jpeg":
+            save_options.update(optimize=True, progressive=True)
+        elif fmt == "webp":
+            save_options["method"] = 4
+        image.save(output, format=fmt.upper(), **save_options)
+        return output.getvalue()
@@ -19,17 +19,21 @@ async def test_screenshot_service_directly():
         service = ScreenshotService("./screenshots")
         print("✅ 服务实例创建成功")
         
-        # 测试简单URL
-        print("\n📸 测试简单URL...")
-        result1 = await service.take_screenshot("https://httpbin.org/html")
-        print(f"结果1: success={result1.get('success')}, error='{result1.get('error', '')}'")
-        
-        # 测试目标URL
-        print("\n📸 测试目标URL...")
-        result2 = await service.take_screenshot("https://wavelifesciences.com/pipeline/research-and-development/")
-        print(f"结果2: success={result2.get('success')}, error='{result2.get('error', '')}'")
-        
-        return result1, result2
+        try:
+            # 测试简单URL
+            print("\n📸 测试简单URL...")
+            result1 = await service.take_screenshot("https://httpbin.org/html")
+            print(f"结果1: success={result1.get('success')}, error='{result1.get('error', '')}'")
+            
+            # 测试目标URL
+            print("\n📸 测试目标URL...")
+            result2 = await service.take_screenshot("https://wavelifesciences.com/pipeline/research-and-development/")
+            print(f"结果2: success={result2.get('success')}, error='{result2.get('error', '')}'")
+            
+            return result1, result2
+        finally:
+            # 关闭浏览器池，等待后台预览生成完成
+            await service.close()
         
     except Exception as e:
         print(f"❌ 直接测试失败: {e}")
@@ -85,13 +89,17 @@ async def test_async_context():
         # 在不同的异步上下文中测试
         service = ScreenshotService("./screenshots")
         
-        async def wrapper():
-            return await service.take_screenshot("https://httpbin.org/html")
-        
-        result = await wrapper()
-        print(f"异步包装测试: success={result.get('success')}")
-        
-        return result
+        try:
+            async def wrapper():
+                return await service.take_screenshot("https://httpbin.org/html")
+            
+            result = await wrapper()
+            print(f"异步包装测试: success={result.get('success')}")
+            
+            return result
+        finally:
+            # 关闭浏览器池，等待后台预览生成完成
+            await service.close()
         
     except Exception as e:
         print(f"❌ 异步上下文测试失败: {e}")
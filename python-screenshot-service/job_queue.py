@@ -0,0 +1,206 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+class JobQueue:
+    """异步截图任务队列
+
+    POST 请求只负责入队并立即返回任务ID，后台 worker 从进程内队列取任务执行。
+    任务状态持久化到本地 SQLite 文件，服务重启后未完成的任务会重新入队，
+    已完成的URL结果按序号单独存储，恢复时只重新截图尚未完成的URL。
+
+    handler(urls, options) 必须是异步生成器，按完成顺序产出 (索引, 结果)。
+    """
+
+    def __init__(self, db_path: str, handler, workers: int = 2):
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = max(1, workers)
+
+        self._conn = None
+        self._db_lock = threading.Lock()
+        self._queue = None
+        self._worker_tasks = []
+
+    async def start(self):
+        """初始化数据库，恢复未完成任务并启动 worker"""
+        self._queue = asyncio.Queue()
+        await asyncio.to_thread(self._init_db)
+
+        pending = await asyncio.to_thread(self._recover_pending)
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        if pending:
+            print(f"🔄 恢复未完成任务: {len(pending)} 个")
+
+        self._worker_tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        print(f"✅ 任务队列已启动: {self.workers} 个 worker")
+
+    async def stop(self):
+        """停止 worker；执行中的任务保持 running 状态，下次启动时重新入队"""
+        for task in self._worker_tasks:
+            task.cancel()
+        for task in self._worker_tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._worker_tasks = []
+
+        if self._conn:
+            await asyncio.to_thread(self._conn.close)
+            self._conn = None
+
+    async def submit(self, urls: list, options: dict = None) -> dict:
+        """创建任务并入队"""
+        now = datetime.now().isoformat()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "urls": urls,
+            "options": options or {},
+            "results": [None] * len(urls),
+            "completed": 0,
+            "error": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None
+        }
+        await asyncio.to_thread(self._insert, job)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def get(self, job_id: str) -> dict:
+        """查询任务，不存在时返回 None"""
+        return await asyncio.to_thread(self._fetch, job_id)
+
+    def queue_size(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                print(f"❌ 任务 {job_id} 执行异常: {e}")
+                await asyncio.to_thread(self._update, job_id, status="failed", error=str(e),
+                                        finished_at=datetime.now().isoformat())
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        job = await asyncio.to_thread(self._fetch, job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return
+
+        # 恢复的任务跳过已有结果的URL
+        pending = [index for index, result in enumerate(job["results"]) if result is None]
+        completed = len(job["urls"]) - len(pending)
+        if completed:
+            print(f"🔄 继续任务 {job_id}: 已完成 {completed} 个，剩余 {len(pending)} 个URL")
+        else:
+            print(f"🔄 开始任务 {job_id}: {len(job['urls'])} 个URL")
+        await asyncio.to_thread(self._update, job_id, status="running", completed=completed,
+                                started_at=job["started_at"] or datetime.now().isoformat())
+
+        urls = [job["urls"][index] for index in pending]
+        async for position, result in self.handler(urls, job["options"]):
+            completed += 1
+            await asyncio.to_thread(self._store_result, job_id, pending[position], result, completed)
+
+        await asyncio.to_thread(self._update, job_id, status="completed",
+                                finished_at=datetime.now().isoformat())
+        print(f"✅ 任务完成 {job_id}")
+
+    # ---- SQLite 访问（在线程池中执行） ----
+
+    def _init_db(self):
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._db_lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    urls TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    results TEXT NOT NULL,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            # 每个URL的结果单独一行，完成一个URL只写入一行
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_results (
+                    job_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    PRIMARY KEY (job_id, idx)
+                )
+            """)
+
+    def _recover_pending(self) -> list:
+        with self._db_lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+            self._conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+        return [row[0] for row in rows]
+
+    def _insert(self, job: dict):
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, urls, options, results, completed, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job["id"], job["status"], json.dumps(job["urls"]), json.dumps(job["options"]),
+                 json.dumps(job["results"]), job["completed"], job["created_at"])
+            )
+
+    def _store_result(self, job_id: str, index: int, result: dict, completed: int):
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, idx, result) VALUES (?, ?, ?)",
+                (job_id, index, json.dumps(result, ensure_ascii=False))
+            )
+            self._conn.execute("UPDATE jobs SET completed = ? WHERE id = ?", (completed, job_id))
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._db_lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _fetch(self, job_id: str) -> dict:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT id, status, urls, options, results, completed, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            stored = self._conn.execute(
+                "SELECT idx, result FROM job_results WHERE job_id = ?", (job_id,)
+            ).fetchall()
+
+        # jobs.results 为入队时的初始列表，逐个完成的结果覆盖在对应序号上
+        results = json.loads(row[4])
+        for index, result in stored:
+            results[index] = json.loads(result)
+        return {
+            "id": row[0],
+            "status": row[1],
+            "urls": json.loads(row[2]),
+            "options": json.loads(row[3]),
+            "results": results,
+            "completed": row[5],
+            "error": row[6],
+            "created_at": row[7],
+            "started_at": row[8],
+            "finished_at": row[9]
+        }
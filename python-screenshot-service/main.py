@@ -1,29 +1,69 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Optional
 import asyncio
+import json
 import os
 import hashlib
 import time
 from datetime import datetime
 from screenshot_service import ScreenshotService
+from job_queue import JobQueue
+from file_serving import ETagCache, serve_file
+from request_interception import INTERCEPTION_PROFILES
+from image_encoding import FORMAT_REQUIREMENTS, IMAGE_FORMATS, Image, format_available, normalize_format
 
 app = FastAPI(title="Python Screenshot Service", version="1.0.0")
 
 # 配置
 SCREENSHOT_DIR = "screenshots"
+MAX_BATCH_URLS = 500  # 单次批量请求最多URL数
+MAX_BATCH_CONCURRENCY = 32  # 批量请求最大并发数
+JOB_WORKERS = 2  # 异步任务 worker 数
+IMAGE_CHUNK_SIZE = 64 * 1024  # 直接返回图片时每次发送的字节数
+RESPONSE_MODES = ("json", "image")  # /screenshot 返回方式
+JOB_DB_PATH = os.path.join(SCREENSHOT_DIR, "jobs.db")
 os.makedirs(SCREENSHOT_DIR, exist_ok=True)
 
 # 初始化截图服务
 screenshot_service = ScreenshotService(SCREENSHOT_DIR)
 
+# 异步任务队列
+job_queue = JobQueue(JOB_DB_PATH, screenshot_service.iter_screenshots, workers=JOB_WORKERS)
+
+# 截图文件的内容哈希（ETag）缓存，优先取目录索引中记录的哈希，避免首次请求读取整个文件
+etag_cache = ETagCache(lookup=screenshot_service.catalog.sha256_of)
+
+@app.on_event("startup")
+async def startup():
+    """启动常驻浏览器池和任务队列"""
+    await screenshot_service.start()
+    # 预热浏览器池，首个请求不再付出冷启动开销
+    probe = await screenshot_service.probe()
+    if not probe["success"]:
+        print(f"⚠️ 浏览器池预热失败: {probe['error']}")
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """停止任务队列，关闭常驻浏览器池"""
+    await job_queue.stop()
+    await screenshot_service.close()
+
 class ScreenshotRequest(BaseModel):
     url: HttpUrl
     options: Optional[dict] = {}
+    response_mode: Optional[str] = "json"
 
 class BatchScreenshotRequest(BaseModel):
     urls: List[HttpUrl]
     options: Optional[dict] = {}
+    concurrency: Optional[int] = None
+
+class JobRequest(BaseModel):
+    urls: List[HttpUrl]
+    options: Optional[dict] = {}
 
 class ScreenshotResponse(BaseModel):
     success: bool
@@ -31,25 +71,109 @@ class ScreenshotResponse(BaseModel):
     path: Optional[str] = None
     url: str
     timestamp: str
+    cached: bool = False
+    format: Optional[str] = None
+    raw_size: Optional[int] = None
+    encoded_size: Optional[int] = None
+    timings: Optional[dict] = None
+    diagnostics: Optional[dict] = None
     error: Optional[str] = None
 
+def validate_options(options: Optional[dict]):
+    """校验截图参数"""
+    profile = (options or {}).get("block_profile")
+    if profile is not None and profile not in INTERCEPTION_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未知的拦截配置: {profile}（可选: {', '.join(INTERCEPTION_PROFILES)}）"
+        )
+    
+    fmt = (options or {}).get("format")
+    if fmt is not None:
+        fmt = normalize_format(fmt)
+        if fmt not in IMAGE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"不支持的图片格式: {fmt}（可选: {', '.join(IMAGE_FORMATS)}）")
+        if not format_available(fmt):
+            raise HTTPException(status_code=400, detail=f"当前环境缺少 {fmt} 编码器（需要 {FORMAT_REQUIREMENTS[fmt]}）")
+    
+    quality = (options or {}).get("quality")
+    if quality is not None and not (isinstance(quality, int) and 1 <= quality <= 100):
+        raise HTTPException(status_code=400, detail="quality 必须是 1 到 100 之间的整数")
+    
+    max_height = (options or {}).get("max_height")
+    if max_height is not None and not (isinstance(max_height, int) and max_height > 0):
+        raise HTTPException(status_code=400, detail="max_height 必须是正整数")
+    
+    if (options or {}).get("tiled"):
+        tile_output = options.get("tile_output", "stitch")
+        if tile_output not in ("stitch", "manifest"):
+            raise HTTPException(status_code=400, detail="tile_output 仅支持 stitch 或 manifest")
+        if tile_output == "stitch" and normalize_format(options.get("format")) != "png":
+            raise HTTPException(status_code=400, detail="分块拼接仅输出 PNG，其他格式请使用 tile_output=manifest")
+        if Image is None:
+            raise HTTPException(status_code=400, detail="分块截图需要安装 Pillow")
+        tile_height = options.get("tile_height")
+        if tile_height is not None and not (isinstance(tile_height, int) and tile_height > 0):
+            raise HTTPException(status_code=400, detail="tile_height 必须是正整数")
+
+def iter_chunks(data: bytes, chunk_size: int = IMAGE_CHUNK_SIZE):
+    """按块产出图片字节，首字节无需等待整张图片发送"""
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size]
+
+def image_response(result: dict) -> StreamingResponse:
+    """把截图结果作为图片流返回，元数据放在响应头中"""
+    data = result["data"]
+    headers = {
+        "Content-Length": str(len(data)),
+        "X-Screenshot-Url": result["url"],
+        "X-Screenshot-Cached": "true" if result.get("cached") else "false"
+    }
+    if result.get("path"):
+        headers["X-Screenshot-Path"] = result["path"]
+    if result.get("timings"):
+        headers["X-Screenshot-Total-Ms"] = str(result["timings"].get("total_ms"))
+    return StreamingResponse(
+        iter_chunks(data),
+        media_type=IMAGE_FORMATS[result.get("format") or "png"]["media_type"],
+        headers=headers
+    )
+
 @app.get("/health")
 async def health_check():
     return {
         "status": "ok",
         "service": "python-screenshot-stealth",
+        "browser_pool": await screenshot_service.browser_pool.health_check(),
+        "cache": await asyncio.to_thread(screenshot_service.cache.stats),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """就绪探针：渲染一个内联页面，确认浏览器池可以截图"""
+    probe = await screenshot_service.probe()
+    return JSONResponse(status_code=200 if probe["success"] else 503, content=probe)
+
 @app.post("/screenshot", response_model=ScreenshotResponse)
 async def take_screenshot(request: ScreenshotRequest):
     """单个URL截图"""
     url = str(request.url)
+    validate_options(request.options)
+    if request.response_mode not in RESPONSE_MODES:
+        raise HTTPException(status_code=400, detail=f"response_mode 仅支持: {', '.join(RESPONSE_MODES)}")
+    as_image = request.response_mode == "image"
+    if as_image and (request.options or {}).get("tiled") and request.options.get("tile_output") == "manifest":
+        raise HTTPException(status_code=400, detail="分块清单由多个文件组成，不能以图片形式返回")
     print(f"📸 收到截图请求: {url}")
     
     try:
-        result = await screenshot_service.take_screenshot(url, request.options)
-        print(f"📋 截图服务返回: {result}")
+        result = await screenshot_service.take_screenshot(url, request.options, include_data=as_image)
+        print(f"📋 截图服务返回: { {k: v for k, v in result.items() if k != 'data'} }")
+        
+        # 图片模式直接返回截图字节
+        if as_image and result.get("success"):
+            return image_response(result)
         
         # 直接返回结果，不进行额外处理
         if result.get("success"):
@@ -59,15 +183,23 @@ async def take_screenshot(request: ScreenshotRequest):
                 path=result.get("path"),
                 url=url,
                 timestamp=result.get("timestamp", datetime.now().isoformat()),
+                cached=result.get("cached", False),
+                format=result.get("format"),
+                raw_size=result.get("raw_size"),
+                encoded_size=result.get("encoded_size"),
+                timings=result.get("timings"),
+                diagnostics=result.get("diagnostics"),
                 error=None
             )
         else:
-            return ScreenshotResponse(
+            response = ScreenshotResponse(
                 success=False,
                 filename=None,
                 path=None,
                 url=url,
                 timestamp=result.get("timestamp", datetime.now().isoformat()),
+                timings=result.get("timings"),
+                diagnostics=result.get("diagnostics"),
                 error=result.get("error", "未知错误")
             )
             
@@ -77,7 +209,7 @@ async def take_screenshot(request: ScreenshotRequest):
         import traceback
         traceback.print_exc()
         
-        return ScreenshotResponse(
+        response = ScreenshotResponse(
             success=False,
             filename=None,
             path=None,
@@ -85,35 +217,39 @@ async def take_screenshot(request: ScreenshotRequest):
             timestamp=datetime.now().isoformat(),
             error=error_msg
         )
+    
+    # 图片模式下失败时返回 502，避免客户端把 JSON 当作图片
+    if as_image:
+        return JSONResponse(status_code=502, content=response.model_dump())
+    return response
 
-@app.post("/screenshot/batch")
-async def take_batch_screenshots(request: BatchScreenshotRequest):
-    """批量URL截图"""
+def validate_batch_request(request: BatchScreenshotRequest):
+    """校验批量请求，返回 (URL列表, 并发数)"""
     urls = [str(url) for url in request.urls]
     
-    if len(urls) > 10:
-        raise HTTPException(status_code=400, detail="单次批量请求最多支持10个URL")
+    if len(urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=400, detail=f"单次批量请求最多支持{MAX_BATCH_URLS}个URL")
     
-    print(f"📸 收到批量截图请求: {len(urls)} 个URL")
+    concurrency = request.concurrency or screenshot_service.config["batch_concurrency"]
+    if not 1 <= concurrency <= MAX_BATCH_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"并发数必须在1到{MAX_BATCH_CONCURRENCY}之间")
     
-    results = []
-    for i, url in enumerate(urls):
-        print(f"[{i + 1}/{len(urls)}] 处理: {url}")
-        
-        try:
-            result = await screenshot_service.take_screenshot(url, request.options)
-            results.append(ScreenshotResponse(**result))
-        except Exception as e:
-            results.append(ScreenshotResponse(
-                success=False,
-                url=url,
-                timestamp=datetime.now().isoformat(),
-                error=str(e)
-            ))
-        
-        # 批量请求间隔
-        if i < len(urls) - 1:
-            await asyncio.sleep(2)
+    validate_options(request.options)
+    return urls, concurrency
+
+@app.post("/screenshot/batch")
+async def take_batch_screenshots(request: BatchScreenshotRequest):
+    """批量URL截图（并发执行，按主机限速）"""
+    urls, concurrency = validate_batch_request(request)
+    
+    print(f"📸 收到批量截图请求: {len(urls)} 个URL (并发 {concurrency})")
+    
+    results = [None] * len(urls)
+    done = 0
+    async for index, result in screenshot_service.iter_screenshots(urls, request.options, concurrency):
+        done += 1
+        print(f"[{done}/{len(urls)}] 完成: {urls[index]}")
+        results[index] = ScreenshotResponse(**result)
     
     success_count = sum(1 for r in results if r.success)
     
@@ -122,36 +258,199 @@ async def take_batch_screenshots(request: BatchScreenshotRequest):
         "summary": {
             "total": len(urls),
             "success": success_count,
-            "failed": len(urls) - success_count
+            "failed": len(urls) - success_count,
+            "concurrency": concurrency
         },
         "results": results
     }
 
+@app.post("/screenshot/batch/stream")
+async def stream_batch_screenshots(request: BatchScreenshotRequest, format: str = "ndjson"):
+    """流式批量截图：每完成一个URL立即推送结果
+    
+    format=ndjson 时每行一个JSON对象，format=sse 时使用 Server-Sent Events。
+    最后一条消息为 summary。
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format 仅支持 ndjson 或 sse")
+    
+    urls, concurrency = validate_batch_request(request)
+    print(f"📸 收到流式批量截图请求: {len(urls)} 个URL (并发 {concurrency}, {format})")
+    
+    def encode(event: str, data: dict) -> str:
+        payload = json.dumps(data, ensure_ascii=False)
+        if format == "sse":
+            return f"event: {event}\ndata: {payload}\n\n"
+        return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+    
+    async def events():
+        success_count = 0
+        done = 0
+        # 结果逐条推送，不在内存中累积
+        async for index, result in screenshot_service.iter_screenshots(urls, request.options, concurrency):
+            done += 1
+            response = ScreenshotResponse(**result)
+            if response.success:
+                success_count += 1
+            print(f"[{done}/{len(urls)}] 推送: {urls[index]}")
+            yield encode("result", {"index": index, "result": response.model_dump()})
+        
+        yield encode("summary", {
+            "total": len(urls),
+            "success": success_count,
+            "failed": len(urls) - success_count,
+            "concurrency": concurrency
+        })
+    
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        events(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """提交异步截图任务，立即返回任务ID"""
+    urls = [str(url) for url in request.urls]
+    
+    if not urls:
+        raise HTTPException(status_code=400, detail="至少需要一个URL")
+    if len(urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=400, detail=f"单个任务最多支持{MAX_BATCH_URLS}个URL")
+    validate_options(request.options)
+    
+    job = await job_queue.submit(urls, request.options)
+    print(f"📥 任务已入队: {job['id']} ({len(urls)} 个URL)")
+    
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "queue_size": job_queue.queue_size(),
+        "created_at": job["created_at"]
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """查询任务状态和结果"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": {
+            "total": len(job["urls"]),
+            "completed": job["completed"]
+        },
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+        "results": [ScreenshotResponse(**r) if r else None for r in job["results"]]
+    }
+
+def parse_time_filter(value: Optional[str], name: str) -> Optional[float]:
+    """ISO 日期/时间转 Unix 时间戳"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} 必须是 ISO 格式日期或时间")
+
+def add_listing_links(items: list):
+    """为目录记录补充下载、缩略图和预览链接"""
+    for item in items:
+        item["download_url"] = f"/screenshots/{item['file_id']}" if item["file_id"] else None
+        item["thumbnail_url"] = item["preview_url"] = None
+        if item["sha256"] and item["file_id"]:
+            previews = screenshot_service.previews.paths_for(item["sha256"])
+            if screenshot_service.previews.exists(previews):
+                item["thumbnail_url"] = f"/screenshots/{os.path.relpath(previews['thumbnail'], SCREENSHOT_DIR)}"
+                item["preview_url"] = f"/screenshots/{os.path.relpath(previews['preview'], SCREENSHOT_DIR)}"
+
 @app.get("/screenshots")
-async def list_screenshots():
-    """获取截图列表"""
+async def list_screenshots(limit: int = 50, cursor: Optional[str] = None, domain: Optional[str] = None,
+                           since: Optional[str] = None, until: Optional[str] = None,
+                           success: Optional[bool] = None):
+    """分页查询截图目录（按时间倒序），next_cursor 用于获取下一页"""
     try:
-        files = []
-        for filename in os.listdir(SCREENSHOT_DIR):
-            if filename.endswith('.png'):
-                filepath = os.path.join(SCREENSHOT_DIR, filename)
-                stat = os.stat(filepath)
-                files.append({
-                    "filename": filename,
-                    "size": stat.st_size,
-                    "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                    "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
-                })
-        
-        files.sort(key=lambda x: x["created"], reverse=True)
-        
-        return {
-            "success": True,
-            "count": len(files),
-            "files": files
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        page = await screenshot_service.catalog.list(
+            limit=limit,
+            cursor=cursor,
+            domain=domain,
+            since=parse_time_filter(since, "since"),
+            until=parse_time_filter(until, "until"),
+            success=success
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # 检查缩略图是否已生成需要访问文件系统，放到线程池中
+    await asyncio.to_thread(add_listing_links, page["items"])
+    
+    return {
+        "success": True,
+        "count": len(page["items"]),
+        "files": page["items"],
+        "next_cursor": page["next_cursor"]
+    }
+
+def resolve_screenshot_file(file_id: str) -> str:
+    """把截图 ID（相对 SCREENSHOT_DIR 的路径）解析为文件路径，拒绝目录穿越和非截图文件"""
+    root = os.path.realpath(SCREENSHOT_DIR)
+    path = os.path.realpath(os.path.join(root, file_id))
+    if os.path.commonpath([root, path]) != root:
+        raise HTTPException(status_code=404, detail="截图不存在")
+    
+    name = os.path.basename(path)
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in [info["ext"] for info in IMAGE_FORMATS.values()] and name != "manifest.json":
+        raise HTTPException(status_code=404, detail="截图不存在")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="截图不存在")
+    return path
+
+@app.api_route("/screenshots/{file_id:path}", methods=["GET", "HEAD"])
+async def get_screenshot_file(file_id: str, request: Request):
+    """下载截图文件，支持 Range 分段、强 ETag 和 If-None-Match 304"""
+    path = await asyncio.to_thread(resolve_screenshot_file, file_id)
+    if path.endswith("manifest.json"):
+        media_type = "application/json"
+    else:
+        media_type = IMAGE_FORMATS[ScreenshotService.format_of(path)]["media_type"]
+    return await serve_file(path, media_type, request.headers, etag_cache)
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """读取会话清单（内容寻址存储模式下每个会话的截图记录）
+
+    session_id 为 screenshots/ 下的第一级目录，与截图列表中的 session 一致；
+    批量脚本的清单位于 <会话>/images/session_* 下，一并读取。
+    """
+    root, session_dir = await asyncio.to_thread(
+        lambda: (os.path.realpath(SCREENSHOT_DIR), os.path.realpath(os.path.join(SCREENSHOT_DIR, session_id)))
+    )
+    if os.path.dirname(session_dir) != root:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    
+    entries = await screenshot_service.blob_store.read_session(session_dir)
+    if entries is None:
+        raise HTTPException(status_code=404, detail="会话清单不存在")
+    for entry in entries:
+        path = entry.get("path")
+        entry["download_url"] = f"/screenshots/{os.path.relpath(path, SCREENSHOT_DIR)}" if path else None
+    
+    return {
+        "success": True,
+        "session": session_id,
+        "count": len(entries),
+        "files": entries
+    }
 
 if __name__ == "__main__":
     import uvicorn
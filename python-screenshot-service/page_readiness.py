@@ -0,0 +1,143 @@
+import asyncio
+import re
+import time
+from request_interception import TRACKER_HOST_PATTERNS
+
+# 页面创建前注入：记录最后一次 DOM 变化时间（只统计节点增删和文本变化，
+# 忽略轮播/动画频繁修改的 style/class 属性）
+READINESS_INIT_SCRIPT = """
+(() => {
+    const state = { lastMutation: performance.now(), mutations: 0 };
+    Object.defineProperty(window, '__pageReadiness', { value: state, enumerable: false });
+    new MutationObserver((records) => {
+        state.mutations += records.length;
+        state.lastMutation = performance.now();
+    }).observe(document, { childList: true, subtree: true, characterData: true });
+})();
+"""
+
+# 每次轮询读取页面内的就绪信号
+READINESS_PROBE_SCRIPT = """
+() => {
+    const state = window.__pageReadiness || { lastMutation: 0, mutations: 0 };
+    const images = Array.from(document.images).filter(img => img.src && !img.complete);
+    return {
+        ready_state: document.readyState,
+        since_mutation_ms: Math.round(performance.now() - state.lastMutation),
+        mutations: state.mutations,
+        pending_images: images.length,
+        fonts_loading: document.fonts ? document.fonts.status === 'loading' : false,
+        height: Math.max(
+            document.body ? document.body.scrollHeight : 0,
+            document.documentElement ? document.documentElement.scrollHeight : 0
+        )
+    };
+}
+"""
+
+# 默认忽略的请求：统计/广告/追踪服务和常见信标路径，这些请求永远不会“空闲”
+DEFAULT_IGNORE_PATTERNS = TRACKER_HOST_PATTERNS + [r"/collect\?", r"/beacon", r"/analytics", r"/pixel"]
+
+class PageReadiness:
+    """页面就绪检测
+
+    组合多个信号判断页面是否已视觉稳定，取代固定等待和 15 秒 networkidle：
+    - DOM 变化静默（MutationObserver）
+    - 待加载的图片和字体数量
+    - 页面高度（布局）稳定
+    - 进行中的网络请求（忽略统计/追踪请求、WebSocket/EventSource 和长轮询）
+    所有信号同时静默 quiet_ms 即返回；超时时报告仍未满足的信号。
+    """
+
+    def __init__(self, page, ignore_patterns: list = None, quiet_ms: int = 500,
+                 long_request_ms: int = 5000, poll_interval_ms: int = 100):
+        self.page = page
+        self.quiet_ms = quiet_ms
+        self.long_request_ms = long_request_ms
+        self.poll_interval = poll_interval_ms / 1000
+        self._ignore = re.compile("|".join(ignore_patterns or DEFAULT_IGNORE_PATTERNS), re.IGNORECASE)
+        self._inflight = {}
+        self.ignored_requests = 0
+
+    def attach(self):
+        """在导航前调用，开始跟踪网络请求"""
+        self.page.on("request", self._on_request)
+        self.page.on("requestfinished", self._on_request_done)
+        self.page.on("requestfailed", self._on_request_done)
+
+    def _on_request(self, request):
+        if (request.resource_type in ("websocket", "eventsource")
+                or request.url.startswith("data:")
+                or self._ignore.search(request.url)):
+            self.ignored_requests += 1
+            return
+        self._inflight[request] = time.monotonic()
+
+    def _on_request_done(self, request):
+        self._inflight.pop(request, None)
+
+    def pending_requests(self) -> int:
+        """进行中的请求数；超过 long_request_ms 的请求视为长轮询，不计入"""
+        cutoff = time.monotonic() - self.long_request_ms / 1000
+        return sum(1 for started in self._inflight.values() if started > cutoff)
+
+    async def wait(self, timeout_ms: int = 15000) -> dict:
+        """等待页面就绪，返回耗时和（超时时）阻塞的信号"""
+        start = time.monotonic()
+        deadline = start + timeout_ms / 1000
+        quiet_s = self.quiet_ms / 1000
+
+        last_height = None
+        height_stable_since = start
+        network_quiet_since = start
+        polls = 0
+        blocked_by = []
+        probe = {}
+
+        while True:
+            now = time.monotonic()
+            polls += 1
+            try:
+                probe = await self.page.evaluate(READINESS_PROBE_SCRIPT)
+            except Exception:
+                # 导航中上下文被销毁，下一轮再试
+                probe = {}
+
+            if probe.get("height") != last_height:
+                last_height = probe.get("height")
+                height_stable_since = now
+
+            pending = self.pending_requests()
+            if pending:
+                network_quiet_since = now
+
+            blocked_by = []
+            if not probe or probe["ready_state"] == "loading":
+                blocked_by.append("document")
+            if probe and probe["since_mutation_ms"] < self.quiet_ms:
+                blocked_by.append("dom_mutations")
+            if probe.get("pending_images"):
+                blocked_by.append("images")
+            if probe.get("fonts_loading"):
+                blocked_by.append("fonts")
+            if now - height_stable_since < quiet_s:
+                blocked_by.append("layout")
+            if now - network_quiet_since < quiet_s:
+                blocked_by.append("network")
+
+            if not blocked_by or now >= deadline:
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        result = {
+            "ready": not blocked_by,
+            "elapsed_ms": round((time.monotonic() - start) * 1000),
+            "polls": polls,
+            "pending_requests": self.pending_requests(),
+            "ignored_requests": self.ignored_requests,
+            "pending_images": probe.get("pending_images", 0),
+            "height": probe.get("height")
+        }
+        if blocked_by:
+            result["blocked_by"] = blocked_by
+        return result
@@ -3,99 +3,45 @@
 制药公司管线批量截图 - 处理所有提供的URL
 包含生物技术公司、大型制药公司等的管线页面
 """
+import argparse
 import asyncio
 import sys
 import os
 import time
-import json
 from datetime import datetime
 from pathlib import Path
 
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# 所有制药公司管线URL
-PHARMA_PIPELINE_URLS = [
-    # RNAi和基因治疗公司
-    {"name": "Alnylam Pharmaceuticals", "url": "https://www.alnylam.com/alnylam-rnai-pipeline", "category": "RNAi"},
-    {"name": "Arrowhead Pharmaceuticals", "url": "https://arrowheadpharma.com/pipeline/", "category": "RNAi"},
-    {"name": "Ionis Pharmaceuticals", "url": "https://ionis.com/pipeline/independent?_format=json", "category": "RNAi"},
-    {"name": "Wave Life Sciences", "url": "https://wavelifesciences.com/pipeline/research-and-development/", "category": "RNAi"},
-    {"name": "Silence Therapeutics", "url": "https://silence-therapeutics.com/our-pipeline/default.aspx", "category": "RNAi"},
-    {"name": "SiRNA Omics", "url": "https://www.sirnaomics.com/cn/science-pipeline/pipeline/", "category": "RNAi"},
-    {"name": "ProQR Therapeutics", "url": "https://www.proqr.com/pipeline", "category": "RNAi"},
-    
-    # 基因编辑公司
-    {"name": "CRISPR Therapeutics", "url": "https://crisprtx.com/pipeline", "category": "Gene Editing"},
-    {"name": "Intellia Therapeutics", "url": "https://www.intelliatx.com/pipeline/", "category": "Gene Editing"},
-    {"name": "Beam Therapeutics", "url": "https://beamtx.com/pipeline/", "category": "Gene Editing"},
-    {"name": "Metagenomi", "url": "https://metagenomi.co/pipeline", "category": "Gene Editing"},
-    
-    # 生物技术公司
-    {"name": "Avidity Biosciences", "url": "https://www.aviditybiosciences.com/pipeline/pipeline-overview", "category": "Biotech"},
-    {"name": "Dyne Therapeutics", "url": "https://www.dyne-tx.com/pipeline/", "category": "Biotech"},
-    {"name": "Denali Therapeutics", "url": "https://www.denalitherapeutics.com/pipeline", "category": "Biotech"},
-    {"name": "Adarx Pharmaceuticals", "url": "https://www.adarx.com/pipeline/", "category": "Biotech"},
-    {"name": "Ribolia", "url": "https://www.ribolia.com/pipeline", "category": "Biotech"},
-    {"name": "Atalanta Therapeutics", "url": "https://www.atalantatx.com/pipeline/", "category": "Biotech"},
-    {"name": "Sarepta Therapeutics", "url": "https://www.sarepta.com/products-pipeline/pipelinel", "category": "Biotech"},
-    {"name": "Rona Therapeutics", "url": "https://www.ronatherapeutics.com/pipeline", "category": "Biotech"},
-    {"name": "Entrada Therapeutics", "url": "https://www.entradatx.com/pipeline", "category": "Biotech"},
-    {"name": "PepGen", "url": "https://www.pepgen.com/pipeline/", "category": "Biotech"},
-    {"name": "Tangram Therapeutics", "url": "https://tangramtx.com/pipeline/", "category": "Biotech"},
-    {"name": "Switch Therapeutics", "url": "https://www.switchthera.com/our-science/", "category": "Biotech"},
-    {"name": "Arobic Therapeutics", "url": "https://www.arobiotx.com/pipeline", "category": "Biotech"},
-    {"name": "Sanegene Bio", "url": "https://www.sanegenebio.com/pipeline/", "category": "Biotech"},
-    {"name": "Sirius RNA", "url": "https://www.siriusrna.com/pipeline/index.html#pipeline", "category": "Biotech"},
-    {"name": "Aligos Therapeutics", "url": "https://aligos.com/science/scientific-overview/", "category": "Biotech"},
-    {"name": "Arbutus Biopharma", "url": "https://www.arbutusbio.com/pipeline/", "category": "Biotech"},
-    {"name": "Camp4 Therapeutics", "url": "https://www.camp4tx.com/pipeline/", "category": "Biotech"},
-    {"name": "Mina Therapeutics", "url": "https://minatx.com/pipeline/", "category": "Biotech"},
-    {"name": "Ractigen Therapeutics", "url": "https://www.ractigen.com/pipeline/", "category": "Biotech"},
-    {"name": "Judo Bio", "url": "https://judo.bio/pipeline/", "category": "Biotech"},
-    {"name": "Rigerna", "url": "https://www.rigerna.com/page/cpgx/", "category": "Biotech"},
-    {"name": "Siran Bio", "url": "https://www.siranbio.com/page/cpgx/", "category": "Biotech"},
-    {"name": "VisiRNA Therapeutics", "url": "https://www.visirna.com/pages/client/pplinea?version=v1", "category": "Biotech"},
-    {"name": "Apellis Pharmaceuticals", "url": "https://apellis.com/our-science/our-pipeline/", "category": "Biotech"},
-    
-    # 大型制药公司
-    {"name": "Eli Lilly", "url": "https://www.lilly.com/innovation/clinical-development-pipeline", "category": "Big Pharma"},
-    {"name": "Novo Nordisk", "url": "https://www.novonordisk.com/science-and-technology/r-d-pipeline.html", "category": "Big Pharma"},
-    {"name": "Novartis", "url": "https://www.novartis.com/research-development/novartis-pipeline", "category": "Big Pharma"},
-    {"name": "Regeneron", "url": "https://www.regeneron.com/science/investigational-pipeline", "category": "Big Pharma"},
-    {"name": "AstraZeneca", "url": "https://www.astrazeneca.com/our-therapy-areas/pipeline.html", "category": "Big Pharma"},
-    {"name": "Roche", "url": "https://www.roche.com/solutions/pipeline", "category": "Big Pharma"},
-    {"name": "Biogen", "url": "https://www.biogen.com/science-and-innovation/pipeline.html", "category": "Big Pharma"},
-    {"name": "Amgen", "url": "https://www.amgenpipeline.com/", "category": "Big Pharma"},
-    {"name": "Johnson & Johnson", "url": "https://www.investor.jnj.com/pipeline/development-pipeline/default.aspx", "category": "Big Pharma"},
-    {"name": "Takeda", "url": "https://www.takeda.com/science/pipeline/", "category": "Big Pharma"},
-    {"name": "GSK", "url": "https://www.gsk.com/en-gb/innovation/pipeline/", "category": "Big Pharma"},
-    {"name": "Sanofi", "url": "https://www.sanofi.com/en/our-science/our-pipeline", "category": "Big Pharma"},
-    {"name": "AbbVie", "url": "https://www.abbvie.com/science/pipeline.html", "category": "Big Pharma"},
-    {"name": "Merck", "url": "https://www.merck.com/research/product-pipeline/", "category": "Big Pharma"},
-    {"name": "Gilead Sciences", "url": "https://www.gilead.com/science/pipeline", "category": "Big Pharma"},
-    {"name": "Boehringer Ingelheim", "url": "https://www.boehringer-ingelheim.com/science-innovation/human-health-innovation/clinical-pipeline", "category": "Big Pharma"},
-    {"name": "Pfizer", "url": "https://www.pfizer.com/science/drug-product-pipeline", "category": "Big Pharma"},
-    {"name": "CSL", "url": "https://www.csl.com/research-and-development/product-pipeline", "category": "Big Pharma"},
-    {"name": "Bristol Myers Squibb", "url": "https://www.bms.com/researchers-and-partners/in-the-pipeline.html", "category": "Big Pharma"},
-    {"name": "Bayer", "url": "https://www.bayer.com/en/pharma/development-pipeline", "category": "Big Pharma"},
-    
-    # 中国/亚洲公司
-    {"name": "Synerk", "url": "https://synerk.cn/productinfo/883480.html", "category": "Asia"},
-    {"name": "Hygeia Pharma", "url": "https://www.hygieiapharma.com/Pipeline/3.html", "category": "Asia"},
-    {"name": "BeBetterMed (CN)", "url": "http://www.bebettermed.cn/goods-2-view.html#rd_4", "category": "Asia"},
-    {"name": "BeBetterMed (COM)", "url": "http://www.bebettermed.com/goods-2-view.html#rd_4", "category": "Asia"},
-    
-    # 其他专业公司
-    {"name": "Olix Pharma", "url": "https://olixpharma.com/rnd/rnd03.php", "category": "Specialty"}
-]
+from checkpoint import CheckpointJournal, resolve_session_dir
+from rate_limit import HostRateLimiter, iter_scheduled
+from report_builder import StreamingReport
+from target_registry import default_registry
+from thumbnails import drop_missing_previews, report_thumbnail_html
+from visual_diff import diff_pairs, np
+
+# 目标清单中的制药公司管线页面标签
+PIPELINE_TAG = "pharma_pipeline"
+
+# 单个网站截图的总超时（秒），超时的网站记为失败，不阻塞其他网站
+URL_TIMEOUT = 180
 
 class PharmaPipelineBatch:
-    def __init__(self):
-        self.session_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def __init__(self, concurrency: int = None, url_timeout: float = URL_TIMEOUT, resume: str = None):
+        self.concurrency = concurrency  # 全局并发数，默认取服务配置 batch_concurrency
+        self.url_timeout = url_timeout
         self.base_dir = Path("screenshots")
-        self.session_dir = self.base_dir / f"pharma_pipeline_{self.session_time}"
+        if resume:
+            # 恢复中断的会话：沿用原目录，已成功的URL不再截图
+            self.session_dir = resolve_session_dir(resume, self.base_dir, "pharma_pipeline")
+            self.session_time = self.session_dir.name.replace("pharma_pipeline_", "", 1)
+        else:
+            self.session_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.session_dir = self.base_dir / f"pharma_pipeline_{self.session_time}"
         self.session_dir.mkdir(parents=True, exist_ok=True)
+        self.journal = CheckpointJournal(self.session_dir)
+        self.targets = default_registry().query(tags=[PIPELINE_TAG])
         
         # 创建分类目录
         self.images_dir = self.session_dir / "images"
@@ -105,11 +51,11 @@ class PharmaPipelineBatch:
         
         print(f"🏥 制药公司管线批量截图")
         print(f"📁 截图保存目录: {self.session_dir}")
-        print(f"🔢 总计网站: {len(PHARMA_PIPELINE_URLS)}")
+        print(f"🔢 总计网站: {len(self.targets)}")
         
         # 按类别统计
         categories = {}
-        for url_info in PHARMA_PIPELINE_URLS:
+        for url_info in self.targets:
             category = url_info["category"]
             categories[category] = categories.get(category, 0) + 1
         
@@ -127,13 +73,14 @@ class PharmaPipelineBatch:
             # 创建截图服务
             service = ScreenshotService(str(self.images_dir))
             
-            # 验证服务
+            # 验证服务：渲染内联页面，同时按并发数预热浏览器池和上下文
             print("\n🧪 验证截图服务...")
-            test_result = await service.take_screenshot("https://httpbin.org/html")
-            if not test_result.get("success"):
-                print(f"❌ 服务验证失败: {test_result.get('error')}")
+            probe = await service.probe(contexts=self.concurrency or service.config["batch_concurrency"])
+            if not probe.get("success"):
+                print(f"❌ 服务验证失败: {probe.get('error')}")
+                await service.close()
                 return
-            print("✅ 服务验证成功")
+            print(f"✅ 服务验证成功 ({probe['elapsed_ms']}ms，已预热 {probe['contexts']} 个上下文)")
             
         except Exception as e:
             print(f"❌ 服务初始化失败: {e}")
@@ -143,60 +90,103 @@ class PharmaPipelineBatch:
         print(f"📸 开始制药公司管线截图")
         print(f"{'='*80}")
         
-        results = []
-        start_time = time.time()
-        batch_size = 5  # 每批5个网站
-        
-        # 按类别分组处理
+        # 按类别分组；报告保持类别分组和组内顺序，与完成顺序无关
         categories = {}
-        for url_info in PHARMA_PIPELINE_URLS:
-            category = url_info["category"]
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(url_info)
-        
-        total_processed = 0
+        for url_info in self.targets:
+            categories.setdefault(url_info["category"], []).append(url_info)
+        ordered = [url_info for urls in categories.values() for url_info in urls]
+        
+        # 所有类别同时调度：全局并发上限 + 按主机限速，慢站点只占用自己的槽位
+        concurrency = self.concurrency or service.config["batch_concurrency"]
+        limiter = HostRateLimiter(service.config["host_min_interval"])
+        print(f"🚦 全局并发: {concurrency} | 同一主机间隔: {limiter.min_interval}s | 单个网站超时: {self.url_timeout}s")
+        
+        # 断点日志：已成功的URL直接复用结果，只调度其余URL
+        resumed = await self.journal.completed()
+        results = [resumed.get(url_info["url"]) for url_info in ordered]
+        # 优先级高的网站先调度
+        pending = sorted((i for i, result in enumerate(results) if result is None),
+                         key=lambda i: -ordered[i]["priority"])
+        if resumed:
+            print(f"♻️ 恢复会话: {len(ordered) - len(pending)} 个网站已成功，跳过；其余 {len(pending)} 个重新截图")
+        
+        remaining = {category: 0 for category in categories}
+        for i in pending:
+            remaining[ordered[i]["category"]] += 1
+        start_time = time.time()
         
-        for category, urls in categories.items():
-            print(f"\n📂 处理类别: {category} ({len(urls)} 个网站)")
-            print("-" * 60)
-            
-            category_start = time.time()
-            category_results = []
-            
-            for i, url_info in enumerate(urls):
-                total_processed += 1
-                result = await self.screenshot_single_url(
-                    service, url_info, total_processed, len(PHARMA_PIPELINE_URLS)
-                )
-                results.append(result)
-                category_results.append(result)
-                
-                # 进度显示
-                success_count = sum(1 for r in results if r.get("success"))
-                print(f"   📊 总进度: {total_processed}/{len(PHARMA_PIPELINE_URLS)} | 成功: {success_count}")
-                
-                # URL间隔
-                if i < len(urls) - 1:
-                    await asyncio.sleep(1.5)
-            
-            category_elapsed = time.time() - category_start
-            category_success = sum(1 for r in category_results if r.get("success"))
+        # 增量报告：每完成一个网站追加一行，运行中即可查看
+        report = self.create_report(list(categories), len(ordered))
+        await report.open()
+        for i, result in enumerate(results):
+            if result is not None:
+                await report.add(result, i)
+        print(f"📄 实时报告: {report.html_file}")
+        
+        def capture(_, index):
+            return self.screenshot_single_url(service, ordered[index], index + 1, len(ordered))
+        
+        async def record(index, result):
+            url_info = ordered[index]
+            results[index] = result
+            await self.journal.append(result)
+            await report.add(result, index)
             
-            print(f"\n📊 {category} 完成: {category_success}/{len(urls)} 成功 ({category_elapsed:.1f}s)")
+            # 进度显示
+            print(f"   📊 总进度: {report.stats.total}/{len(ordered)} | 成功: {report.stats.success}")
             
-            # 类别间等待
-            if category != list(categories.keys())[-1]:  # 不是最后一个类别
-                print("⏳ 类别间等待 3 秒...\n")
-                await asyncio.sleep(3)
+            category = url_info["category"]
+            remaining[category] -= 1
+            if remaining[category] == 0:
+                stats = report.stats.category_stats[category]
+                print(f"\n📊 {category} 完成: {stats['success']}/{stats['total']} 成功 "
+                      f"({time.time() - start_time:.1f}s)")
+        
+        scheduled = iter_scheduled(pending, capture, limiter, concurrency, url_of=lambda index: ordered[index]["url"])
+        try:
+            async for position, result in scheduled:
+                await record(pending[position], result)
+        finally:
+            await scheduled.aclose()
+            await self.journal.close()
+            await report.close()
         
         total_time = time.time() - start_time
         
-        # 生成报告
-        await self.generate_comprehensive_report(results, total_time)
+        # 关闭浏览器池（等待缩略图生成完成）
+        await service.close()
+        await drop_missing_previews(results)
+        
+        # 对比变化页面与上次截图
+        await self.generate_diffs(results, report)
+        
+        # 完成报告
+        await self.finish_report(report, total_time)
         
         return results
     
+    async def generate_diffs(self, results, report):
+        """为已变化的页面生成与上次截图的差异图（进程池并行），并更新报告中对应的行"""
+        changed = [
+            (i, r) for i, r in enumerate(results)
+            if r.get("changed") and r.get("previous") and r.get("path")
+        ]
+        if not changed or np is None:
+            return
+        
+        print(f"\n🔍 生成差异图: {len(changed)} 个变化页面")
+        diffs = await asyncio.to_thread(
+            diff_pairs, [(r["previous"], r["path"]) for _, r in changed], str(self.session_dir / "diffs")
+        )
+        for (index, result), diff in zip(changed, diffs):
+            result["diff"] = {
+                "changed_ratio": diff.get("changed_ratio"),
+                "boxes": diff.get("boxes"),
+                "diff_image": diff.get("diff_image"),
+                "error": diff.get("error")
+            }
+            await report.update(result, index)
+    
     async def screenshot_single_url(self, service, url_info, index, total):
         """截图单个URL"""
         name = url_info["name"]
@@ -210,24 +200,36 @@ class PharmaPipelineBatch:
         start_time = time.time()
         
         try:
-            result = await service.take_screenshot(url, {"headless": True})
+            # 与上次运行的截图比较，未变化的页面只保存引用；目标清单中的站点参数覆盖默认值
+            result = await asyncio.wait_for(
+                service.take_screenshot(url, {"headless": True, "detect_changes": True, **url_info["options"]}),
+                timeout=self.url_timeout
+            )
             elapsed = time.time() - start_time
             
             if result.get("success"):
                 filename = result.get("filename", "")
-                print(f"           ✅ 成功 ({elapsed:.1f}s) - {filename}")
+                change = result.get("change") or {}
+                change_label = {True: "已变化", False: "未变化", None: "首次截图"}[change.get("changed")]
+                print(f"           ✅ {name} 成功 ({elapsed:.1f}s) - {filename} [{change_label}]")
                 return {
                     "name": name,
                     "url": url,
                     "category": category,
                     "success": True,
                     "filename": filename,
+                    "path": result.get("path"),
+                    "thumbnail": result.get("thumbnail"),
+                    "preview": result.get("preview"),
+                    "changed": change.get("changed"),
+                    "stored_as_reference": change.get("stored_as_reference", False),
+                    "previous": change.get("previous"),
                     "elapsed": elapsed,
                     "timestamp": datetime.now().isoformat()
                 }
             else:
                 error = result.get("error", "未知错误")
-                print(f"           ❌ 失败 ({elapsed:.1f}s) - {error}")
+                print(f"           ❌ {name} 失败 ({elapsed:.1f}s) - {error}")
                 return {
                     "name": name,
                     "url": url,
@@ -238,9 +240,22 @@ class PharmaPipelineBatch:
                     "timestamp": datetime.now().isoformat()
                 }
                 
+        except asyncio.TimeoutError:
+            elapsed = time.time() - start_time
+            error = f"超过 {self.url_timeout}s 未完成，已跳过"
+            print(f"           ⏱️ {name} 超时 ({elapsed:.1f}s)")
+            return {
+                "name": name,
+                "url": url,
+                "category": category,
+                "success": False,
+                "error": error,
+                "elapsed": elapsed,
+                "timestamp": datetime.now().isoformat()
+            }
         except Exception as e:
             elapsed = time.time() - start_time
-            print(f"           ❌ 异常 ({elapsed:.1f}s) - {str(e)}")
+            print(f"           ❌ {name} 异常 ({elapsed:.1f}s) - {str(e)}")
             return {
                 "name": name,
                 "url": url,
@@ -251,25 +266,31 @@ class PharmaPipelineBatch:
                 "timestamp": datetime.now().isoformat()
             }
     
-    async def generate_comprehensive_report(self, results, total_time):
-        """生成综合报告"""
-        total = len(results)
-        success_count = sum(1 for r in results if r.get("success"))
-        failed_count = total - success_count
-        avg_time = sum(r.get("elapsed", 0) for r in results) / total if results else 0
-        
-        # 按类别统计
-        category_stats = {}
-        for result in results:
-            category = result["category"]
-            if category not in category_stats:
-                category_stats[category] = {"total": 0, "success": 0, "failed": 0}
-            
-            category_stats[category]["total"] += 1
-            if result.get("success"):
-                category_stats[category]["success"] += 1
-            else:
-                category_stats[category]["failed"] += 1
+    def create_report(self, categories, expected):
+        """创建增量报告（JSON 汇总 + 结果 JSONL + HTML）"""
+        return StreamingReport(
+            self.reports_dir,
+            f"pharma_pipeline_report_{self.session_time}",
+            session_info={
+                "session_id": self.session_time,
+                "type": "pharma_pipeline_batch",
+                "start_time": datetime.now().isoformat(),
+                "session_dir": str(self.session_dir)
+            },
+            categories=categories,
+            expected=expected,
+            title="🏥 制药公司管线截图报告",
+            styles=REPORT_STYLES,
+            render_row=result_row_html
+        )
+    
+    async def finish_report(self, report, total_time):
+        """写出最终报告并打印汇总（只读取增量汇总，不再扫描全部结果）"""
+        report_data = await report.finalize(total_time)
+        summary = report_data["summary"]
+        stats = report.stats
+        total = summary["total"]
+        success_count = summary["success"]
         
         # 控制台报告
         print(f"\n{'='*80}")
@@ -278,71 +299,43 @@ class PharmaPipelineBatch:
         print(f"完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"总计网站: {total}")
         print(f"成功截图: {success_count} 个")
-        print(f"失败截图: {failed_count} 个")
-        print(f"成功率: {success_count/total*100:.1f}%")
+        print(f"失败截图: {summary['failed']} 个")
+        print(f"成功率: {summary['success_rate']:.1f}%")
         print(f"总耗时: {total_time:.1f}s ({total_time/60:.1f}分钟)")
-        print(f"平均耗时: {avg_time:.1f}s")
+        print(f"平均耗时: {summary['average_time']:.1f}s")
+        print(f"页面变化: {summary['changed']} 个已变化, {summary['unchanged']} 个未变化（仅保存引用）")
         
         # 分类统计
         print(f"\n📊 分类统计:")
-        for category, stats in category_stats.items():
-            success_rate = stats["success"] / stats["total"] * 100 if stats["total"] > 0 else 0
-            print(f"   • {category}: {stats['success']}/{stats['total']} ({success_rate:.1f}%)")
-        
-        # 成功列表（按类别）
-        print(f"\n✅ 成功截图 ({success_count}个):")
-        for category in category_stats.keys():
-            category_success = [r for r in results if r.get("success") and r["category"] == category]
-            if category_success:
-                print(f"\n   📂 {category}:")
-                for r in category_success:
-                    print(f"      • {r['name']} ({r.get('elapsed', 0):.1f}s)")
+        for category, category_stats in stats.category_stats.items():
+            success_rate = category_stats["success"] / category_stats["total"] * 100 if category_stats["total"] > 0 else 0
+            print(f"   • {category}: {category_stats['success']}/{category_stats['total']} ({success_rate:.1f}%)")
+        
+        # 相对上次运行发生变化的公司
+        if stats.changed_sites:
+            print(f"\n🔄 管线页面已变化 ({len(stats.changed_sites)}个):")
+            for r in stats.changed_sites:
+                print(f"      • {r['name']} ({r['category']})")
         
         # 失败列表
-        failed_sites = [r for r in results if not r.get("success")]
-        if failed_sites:
-            print(f"\n❌ 失败截图 ({len(failed_sites)}个):")
-            for category in category_stats.keys():
-                category_failed = [r for r in failed_sites if r["category"] == category]
-                if category_failed:
+        if summary["failed"]:
+            print(f"\n❌ 失败截图 ({summary['failed']}个):")
+            for category, failures in stats.failures.items():
+                if failures:
                     print(f"\n   📂 {category}:")
-                    for r in category_failed:
+                    for r in failures:
                         error = r.get('error', '未知错误')[:50]
                         print(f"      • {r['name']} - {error}")
         
-        # 保存详细报告
-        report_data = {
-            "session_info": {
-                "session_id": self.session_time,
-                "type": "pharma_pipeline_batch",
-                "start_time": datetime.now().isoformat(),
-                "session_dir": str(self.session_dir)
-            },
-            "summary": {
-                "total": total,
-                "success": success_count,
-                "failed": failed_count,
-                "success_rate": success_count/total*100 if total > 0 else 0,
-                "total_time": total_time,
-                "average_time": avg_time
-            },
-            "category_stats": category_stats,
-            "results": results
-        }
-        
-        json_report_file = self.reports_dir / f"pharma_pipeline_report_{self.session_time}.json"
-        with open(json_report_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, indent=2, ensure_ascii=False)
-        
-        # 生成HTML报告
-        html_report_file = self.reports_dir / f"pharma_pipeline_report_{self.session_time}.html"
-        await self.generate_html_report(html_report_file, report_data)
-        
         print(f"\n📄 报告已保存:")
-        print(f"   JSON: {json_report_file}")
-        print(f"   HTML: {html_report_file}")
+        print(f"   JSON: {report.json_file}")
+        print(f"   结果: {report.results_file}")
+        print(f"   HTML: {report.html_file}")
         print(f"   截图: {self.images_dir}")
         
+        if not total:
+            return
+        
         # 性能评估
         print(f"\n📈 性能评估:")
         if success_count/total >= 0.9:
@@ -359,118 +352,77 @@ class PharmaPipelineBatch:
         print(f"   • Python + Playwright-Stealth 方案在制药行业网站表现{'优秀' if success_count/total >= 0.8 else '良好' if success_count/total >= 0.7 else '一般'}")
         if success_count > 0:
             print(f"   • 可以作为制药行业管线监控的有效工具")
-    
-    async def generate_html_report(self, html_file, report_data):
-        """生成HTML报告"""
-        html_content = f"""
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>制药公司管线截图报告</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
-        .container {{ max-width: 1400px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-        .header {{ text-align: center; margin-bottom: 30px; }}
-        .summary {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin-bottom: 30px; }}
-        .stat-card {{ background: #f8f9fa; padding: 15px; border-radius: 6px; text-align: center; }}
-        .stat-value {{ font-size: 24px; font-weight: bold; color: #007bff; }}
-        .stat-label {{ color: #666; margin-top: 5px; }}
-        .category-section {{ margin: 20px 0; }}
-        .category-header {{ background: #e9ecef; padding: 10px; border-radius: 4px; font-weight: bold; }}
-        .result-item {{ display: flex; align-items: center; padding: 8px; margin: 3px 0; border-radius: 4px; }}
-        .success {{ background-color: #d4edda; border-left: 4px solid #28a745; }}
-        .failure {{ background-color: #f8d7da; border-left: 4px solid #dc3545; }}
-        .status-icon {{ margin-right: 10px; font-size: 16px; }}
-        .company-name {{ font-weight: bold; margin-right: 10px; min-width: 200px; }}
-        .company-url {{ color: #666; font-size: 11px; flex: 1; }}
-        .elapsed-time {{ margin-left: auto; color: #666; min-width: 60px; }}
-        .error-msg {{ color: #dc3545; font-size: 11px; margin-left: 10px; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🏥 制药公司管线截图报告</h1>
-            <p>会话ID: {report_data['session_info']['session_id']}</p>
-            <p>生成时间: {report_data['session_info']['start_time']}</p>
-        </div>
-        
-        <div class="summary">
-            <div class="stat-card">
-                <div class="stat-value">{report_data['summary']['total']}</div>
-                <div class="stat-label">总计网站</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value">{report_data['summary']['success']}</div>
-                <div class="stat-label">成功截图</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value">{report_data['summary']['failed']}</div>
-                <div class="stat-label">失败截图</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value">{report_data['summary']['success_rate']:.1f}%</div>
-                <div class="stat-label">成功率</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value">{report_data['summary']['total_time']:.1f}s</div>
-                <div class="stat-label">总耗时</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value">{report_data['summary']['average_time']:.1f}s</div>
-                <div class="stat-label">平均耗时</div>
-            </div>
-        </div>
-"""
-        
-        # 按类别显示结果
-        for category, stats in report_data['category_stats'].items():
-            category_results = [r for r in report_data['results'] if r['category'] == category]
-            success_rate = stats['success'] / stats['total'] * 100 if stats['total'] > 0 else 0
-            
-            html_content += f"""
-        <div class="category-section">
-            <div class="category-header">
-                📂 {category} - {stats['success']}/{stats['total']} 成功 ({success_rate:.1f}%)
-            </div>
-"""
-            
-            for result in category_results:
-                success = result.get('success', False)
-                css_class = 'success' if success else 'failure'
-                icon = '✅' if success else '❌'
-                
-                html_content += f"""
-            <div class="result-item {css_class}">
+
+# HTML 报告样式
+REPORT_STYLES = """
+        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }
+        .container { max-width: 1400px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        .header { text-align: center; margin-bottom: 30px; }
+        .summary { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin-bottom: 30px; }
+        .stat-card { background: #f8f9fa; padding: 15px; border-radius: 6px; text-align: center; }
+        .stat-value { font-size: 24px; font-weight: bold; color: #007bff; }
+        .stat-label { color: #666; margin-top: 5px; }
+        .category-section { margin: 20px 0; }
+        .category-header { background: #e9ecef; padding: 10px; border-radius: 4px; font-weight: bold; }
+        .result-item { display: flex; align-items: center; padding: 8px; margin: 3px 0; border-radius: 4px; }
+        .success { background-color: #d4edda; border-left: 4px solid #28a745; }
+        .failure { background-color: #f8d7da; border-left: 4px solid #dc3545; }
+        .status-icon { margin-right: 10px; font-size: 16px; }
+        .company-name { font-weight: bold; margin-right: 10px; min-width: 200px; }
+        .company-url { color: #666; font-size: 11px; flex: 1; }
+        .elapsed-time { margin-left: auto; color: #666; min-width: 60px; }
+        .thumbnail { width: 160px; height: 120px; object-fit: cover; margin-right: 12px; border: 1px solid #ddd; border-radius: 4px; }
+        .full-link { font-size: 11px; margin-left: 10px; }
+        .change-badge { font-size: 11px; padding: 2px 6px; border-radius: 3px; margin-left: 10px; }
+        .changed { background: #fff3cd; color: #856404; font-weight: bold; }
+        .unchanged { background: #e9ecef; color: #666; }
+        .error-msg { color: #dc3545; font-size: 11px; margin-left: 10px; }"""
+
+def result_row_html(result, report_dir):
+    """HTML 报告中的一行结果"""
+    success = result.get('success', False)
+    css_class = 'success' if success else 'failure'
+    icon = '✅' if success else '❌'
+    return f"""<div class="result-item {css_class}">
                 <span class="status-icon">{icon}</span>
+                {report_thumbnail_html(result, report_dir) if success else ''}
                 <div class="company-name">{result['name']}</div>
                 <div class="company-url">{result['url']}</div>
+                {change_badge_html(result, report_dir) if success else ''}
                 <div class="elapsed-time">{result.get('elapsed', 0):.1f}s</div>
                 {f'<div class="error-msg">{result.get("error", "")[:50]}</div>' if not success else ''}
-            </div>
-"""
-            
-            html_content += "</div>"
-        
-        html_content += """
-    </div>
-</body>
-</html>
-"""
-        
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            </div>"""
+
+def change_badge_html(result, report_dir):
+    """相对上次运行的变化标记，有差异图时附链接"""
+    changed = result.get("changed")
+    if changed is True:
+        diff_image = (result.get("diff") or {}).get("diff_image")
+        if diff_image:
+            href = os.path.relpath(diff_image, report_dir)
+            ratio = result["diff"]["changed_ratio"] * 100
+            return f'<a class="change-badge changed" href="{href}" target="_blank">🔄 已变化 {ratio:.1f}% · 差异图</a>'
+        return '<span class="change-badge changed">🔄 已变化</span>'
+    if changed is False:
+        return '<span class="change-badge unchanged">未变化</span>'
+    return '<span class="change-badge unchanged">首次截图</span>'
 
 async def main():
+    parser = argparse.ArgumentParser(description="制药公司管线批量截图")
+    parser.add_argument("--resume", metavar="SESSION", help="恢复中断的会话（目录路径、目录名或时间戳）")
+    args = parser.parse_args()
+    
     print("🏥 制药公司管线批量截图工具")
     print("📋 将截图所有主要制药公司的管线页面")
     
     try:
-        batch_manager = PharmaPipelineBatch()
+        try:
+            batch_manager = PharmaPipelineBatch(resume=args.resume)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
         
-        confirm = input(f"\n确认开始截图 {len(PHARMA_PIPELINE_URLS)} 个制药公司网站? (y/N): ").strip().lower()
+        confirm = input(f"\n确认开始截图 {len(batch_manager.targets)} 个制药公司网站? (y/N): ").strip().lower()
         
         if confirm in ['y', 'yes']:
             print(f"\n🚀 开始批量截图...")
@@ -0,0 +1,205 @@
+import asyncio
+from urllib.parse import urlparse
+
+# 在页面内一次性扫描所有候选按钮并打分；得分低于 minScore 的不点击，
+# 仅部分文本/属性匹配的按钮必须位于浮层（固定定位、对话框、高 z-index）中，避免误点正文链接
+# 参数: [弹窗文本列表, 是否直接点击最佳候选]
+# 返回: 最佳候选的描述（text/score/selector），没有候选时返回 null
+POPUP_SCAN_SCRIPT = """
+([texts, clickBest]) => {
+    const wanted = texts.map(t => t.toLowerCase());
+    const containerPattern = /cookie|consent|gdpr|privacy|onetrust|cmp|didomi|usercentrics|banner|modal|dialog|popup|overlay/i;
+    const attrPattern = /accept|agree|allow|consent/i;
+    const minScore = 50;
+
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none' && style.opacity !== '0';
+    };
+
+    const inOverlay = (el) => {
+        for (let node = el, depth = 0; node && node !== document.body && depth < 10; node = node.parentElement, depth++) {
+            const role = node.getAttribute('role');
+            if (role === 'dialog' || role === 'alertdialog' || node.getAttribute('aria-modal') === 'true') return true;
+            const style = window.getComputedStyle(node);
+            if (style.position === 'fixed' || style.position === 'sticky') return true;
+            if (parseInt(style.zIndex, 10) >= 1000) return true;
+        }
+        return false;
+    };
+
+    const describe = (el) => {
+        if (el.id && document.querySelectorAll('#' + CSS.escape(el.id)).length === 1) {
+            return '#' + CSS.escape(el.id);
+        }
+        const testId = el.getAttribute('data-testid');
+        if (testId) return `${el.tagName.toLowerCase()}[data-testid="${testId}"]`;
+        const classes = Array.from(el.classList).slice(0, 3).map(c => '.' + CSS.escape(c)).join('');
+        return el.tagName.toLowerCase() + classes;
+    };
+
+    const candidates = document.querySelectorAll(
+        'button, a, [role="button"], input[type="button"], input[type="submit"], [onclick], ' +
+        '[id*="accept" i], [data-testid*="accept" i], [class*="accept" i]'
+    );
+
+    let best = null;
+    for (const el of candidates) {
+        const text = (el.innerText || el.value || el.getAttribute('aria-label') || '').trim();
+        const lower = text.toLowerCase();
+        let score = 0;
+
+        const exact = wanted.indexOf(lower);
+        if (exact >= 0) {
+            // 完全匹配，配置中越靠前优先级越高
+            score += 100 - exact;
+        } else if (text && text.length <= 40 && wanted.some(w => w.length > 2 && lower.includes(w))) {
+            score += 40;
+        }
+
+        const attrs = `${el.id} ${el.className} ${el.getAttribute('data-testid') || ''}`;
+        if (attrPattern.test(attrs)) score += 30;
+        if (score === 0) continue;
+
+        let parent = el.parentElement;
+        for (let depth = 0; parent && depth < 8; depth++, parent = parent.parentElement) {
+            if (containerPattern.test(`${parent.id} ${parent.className} ${parent.getAttribute('role') || ''}`)) {
+                score += 15;
+                break;
+            }
+        }
+        if (el.tagName === 'BUTTON') score += 5;
+
+        if (exact < 0) {
+            // 部分匹配只在浮层中有效
+            if (!inOverlay(el)) continue;
+            score += 20;
+        }
+        if (score < minScore) continue;
+
+        if ((!best || score > best.score) && isVisible(el)) {
+            best = { el, score, text: text.slice(0, 60) };
+        }
+    }
+
+    if (!best) return null;
+
+    const result = { text: best.text, score: best.score, selector: describe(best.el) };
+    if (clickBest) {
+        best.el.click();
+        result.clicked = true;
+    } else {
+        document.querySelectorAll('[data-popup-candidate]').forEach(el => el.removeAttribute('data-popup-candidate'));
+        best.el.setAttribute('data-popup-candidate', '1');
+    }
+    return result;
+}
+"""
+
+# 点击扫描阶段标记的候选元素
+POPUP_CLICK_SCRIPT = """
+() => {
+    const el = document.querySelector('[data-popup-candidate]');
+    if (!el) return false;
+    el.removeAttribute('data-popup-candidate');
+    el.click();
+    return true;
+}
+"""
+
+# 直接点击已记住的选择器，记录了按钮文本时只点击文本一致的元素（选择器唯一时也校验，
+# 避免页面改版后同一选择器指向别的按钮）
+# 参数: [选择器, 按钮文本]
+REMEMBERED_CLICK_SCRIPT = """
+([selector, text]) => {
+    const lower = (text || '').toLowerCase();
+    let elements;
+    try {
+        elements = document.querySelectorAll(selector);
+    } catch (e) {
+        return null;
+    }
+    for (const el of elements) {
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) continue;
+        const elText = (el.innerText || el.value || el.getAttribute('aria-label') || '').trim();
+        // 记录的文本截断为 60 个字符，比较时同样截断
+        if (lower && elText.slice(0, 60).toLowerCase() !== lower) continue;
+        el.click();
+        return { text: elText.slice(0, 60), selector, clicked: true };
+    }
+    return null;
+}
+"""
+
+def _frame_host(frame) -> str:
+    return urlparse(frame.url).netloc.lower()
+
+async def _click_remembered(page, remembered: dict):
+    """在记录的 frame 中直接点击已记住的选择器"""
+    frame_host = remembered.get("frame_host")
+    if frame_host:
+        frame = next((f for f in page.frames if f != page.main_frame and _frame_host(f) == frame_host), None)
+        if frame is None:
+            return None
+    else:
+        frame = page.main_frame
+
+    try:
+        match = await frame.evaluate(REMEMBERED_CLICK_SCRIPT, [remembered["selector"], remembered.get("text", "")])
+    except Exception:
+        return None
+    if match:
+        match["frame"] = frame.url
+        match["frame_host"] = frame_host
+        match["remembered"] = True
+    return match
+
+async def _scan_frame(frame, texts, click_best):
+    try:
+        return await frame.evaluate(POPUP_SCAN_SCRIPT, [texts, click_best])
+    except Exception:
+        # 跨域/已销毁的 frame 直接忽略
+        return None
+
+async def dismiss_popups(page, texts: list, remembered: dict = None):
+    """单次扫描关闭弹窗
+
+    传入 remembered（该域名上次命中的选择器记录）时先直接点击它，一次往返即可；
+    否则（或未命中时）主文档内一次 evaluate 完成查找、打分和点击；主文档没有候选时，
+    并发扫描所有 iframe（如 consent 管理平台的 frame），点击得分最高的一个。
+    返回被点击元素的描述，没有弹窗时返回 None。
+    """
+    if remembered:
+        match = await _click_remembered(page, remembered)
+        if match:
+            return match
+
+    match = await _scan_frame(page.main_frame, texts, True)
+    if match:
+        match["frame"] = page.main_frame.url
+        match["frame_host"] = None
+        return match
+
+    child_frames = [f for f in page.frames if f != page.main_frame and not f.is_detached()]
+    if not child_frames:
+        return None
+
+    matches = await asyncio.gather(*(_scan_frame(f, texts, False) for f in child_frames))
+    best_frame, best_match = None, None
+    for frame, frame_match in zip(child_frames, matches):
+        if frame_match and (best_match is None or frame_match["score"] > best_match["score"]):
+            best_frame, best_match = frame, frame_match
+
+    if best_match is None:
+        return None
+
+    try:
+        best_match["clicked"] = await best_frame.evaluate(POPUP_CLICK_SCRIPT)
+    except Exception:
+        return None
+    best_match["frame"] = best_frame.url
+    best_match["frame_host"] = _frame_host(best_frame)
+    return best_match if best_match["clicked"] else None
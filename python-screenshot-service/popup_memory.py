@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from urllib.parse import urlparse
+
+class PopupSelectorMemory:
+    """按域名记录实际关闭弹窗的选择器
+
+    每个站点的 consent 弹窗基本固定，记住上次命中的选择器后，下次先直接尝试它，
+    未命中再退回通用扫描。数据保存在一个小 JSON 文件中，跨运行复用。
+    """
+
+    # 连续未命中次数超过该值时丢弃记录
+    MAX_MISSES = 3
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries = None
+        self._save_lock = asyncio.Lock()
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        host = urlparse(url).netloc.lower()
+        return host[4:] if host.startswith("www.") else host
+
+    async def _load(self) -> dict:
+        """首次使用时在线程池中读取记录文件"""
+        if self._entries is None:
+            entries = await asyncio.to_thread(self._read)
+            if self._entries is None:
+                self._entries = entries
+        return self._entries
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    async def get(self, url: str) -> dict:
+        """返回域名对应的选择器记录，没有时返回 None"""
+        return (await self._load()).get(self.domain_of(url))
+
+    async def record_success(self, url: str, match: dict):
+        """记录命中的选择器（新学到的或已记住的）"""
+        domain = self.domain_of(url)
+        entries = await self._load()
+        entry = entries.get(domain)
+
+        if entry and entry["selector"] == match["selector"] and entry.get("frame_host") == match.get("frame_host"):
+            entry["hits"] += 1
+            entry["misses"] = 0
+        else:
+            entry = {
+                "selector": match["selector"],
+                "text": match.get("text", ""),
+                "frame_host": match.get("frame_host"),
+                "hits": 1,
+                "misses": 0
+            }
+            entries[domain] = entry
+        entry["updated_at"] = datetime.now().isoformat()
+        await self._save()
+
+    async def record_miss(self, url: str):
+        """已记住的选择器未命中，连续多次未命中则丢弃"""
+        domain = self.domain_of(url)
+        entries = await self._load()
+        entry = entries.get(domain)
+        if not entry:
+            return
+
+        entry["misses"] += 1
+        if entry["misses"] >= self.MAX_MISSES:
+            del entries[domain]
+        await self._save()
+
+    async def _save(self):
+        async with self._save_lock:
+            snapshot = json.dumps(self._entries, indent=2, ensure_ascii=False)
+            await asyncio.to_thread(self._write, snapshot)
+
+    def _write(self, content: str):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, self.path)
@@ -13,17 +13,10 @@ from pathlib import Path
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# 关键网站列表
-KEY_SITES = [
-    {"name": "Wave Life Sciences", "url": "https://wavelifesciences.com/pipeline/research-and-development/"},
-    {"name": "Silence Therapeutics", "url": "https://silence-therapeutics.com/our-pipeline/default.aspx"},
-    {"name": "Alnylam", "url": "https://www.alnylam.com/alnylam-rnai-pipeline"},
-    {"name": "Arrowhead Pharma", "url": "https://arrowheadpharma.com/pipeline/"},
-    {"name": "CRISPR Therapeutics", "url": "https://crisprtx.com/pipeline"},
-    {"name": "Intellia Therapeutics", "url": "https://www.intelliatx.com/pipeline/"},
-    {"name": "Beam Therapeutics", "url": "https://beamtx.com/pipeline/"},
-    {"name": "Novartis", "url": "https://www.novartis.com/research-development/novartis-pipeline"}
-]
+from target_registry import default_registry
+
+# 关键网站列表（目标清单中标记为 quick 的网站）
+KEY_SITES = default_registry().query(tags=["quick"], by_priority=True)
 
 async def quick_batch_screenshot():
     """快速批量截图"""
@@ -58,7 +51,7 @@ async def quick_batch_screenshot():
             site_start = time.time()
             
             try:
-                result = await service.take_screenshot(site['url'], {"headless": True})
+                result = await service.take_screenshot(site['url'], {"headless": True, **site['options']})
                 elapsed = time.time() - site_start
                 
                 if result.get("success"):
@@ -84,6 +77,9 @@ async def quick_batch_screenshot():
                 await asyncio.sleep(1)
         
         total_time = time.time() - start_time
+        
+        # 关闭浏览器池
+        await service.close()
         success_count = sum(1 for r in results if r.get("success"))
         
         # 生成简单报告
@@ -111,18 +107,17 @@ async def quick_batch_screenshot():
                 print(f"   • {r['name']} - {r.get('error', '未知错误')}")
         
         # 保存简单报告
-        import json
+        from async_io import write_json
         report_file = session_dir / f"report_{session_time}.json"
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "session_time": session_time,
-                "total": len(results),
-                "success": success_count,
-                "failed": len(results) - success_count,
-                "success_rate": success_count/len(results)*100,
-                "total_time": total_time,
-                "results": results
-            }, f, indent=2, ensure_ascii=False)
+        await write_json(report_file, {
+            "session_time": session_time,
+            "total": len(results),
+            "success": success_count,
+            "failed": len(results) - success_count,
+            "success_rate": success_count/len(results)*100,
+            "total_time": total_time,
+            "results": results
+        })
         
         print(f"\n📄 报告已保存: {report_file}")
         print(f"📁 截图目录: {session_dir}")
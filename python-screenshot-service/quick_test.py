@@ -6,26 +6,12 @@ import asyncio
 import aiohttp
 import time
 
+from target_registry import default_registry
+
 API_BASE = "http://localhost:8000"
 
-# 快速测试的URL（从12文件夹中选择的最重要的几个）
-QUICK_TEST_URLS = [
-    {
-        "url": "https://wavelifesciences.com/pipeline/research-and-development/",
-        "name": "Wave Life Sciences",
-        "reason": "12文件夹Python代码成功抓取的网站"
-    },
-    {
-        "url": "https://www.alnylam.com/alnylam-rnai-pipeline", 
-        "name": "Alnylam",
-        "reason": "RNAi领域知名公司，可能有反爬保护"
-    },
-    {
-        "url": "https://crisprtx.com/pipeline",
-        "name": "CRISPR Therapeutics", 
-        "reason": "基因编辑公司，测试反检测效果"
-    }
-]
+# 快速测试的URL（目标清单中标记为 smoke 的网站）
+QUICK_TEST_URLS = default_registry().query(tags=["smoke"], by_priority=True)
 
 async def check_service():
     """检查服务状态"""
@@ -93,7 +79,7 @@ async def main():
         if await quick_screenshot(url_info):
             success_count += 1
         
-        print(f"   原因: {url_info['reason']}")
+        print(f"   原因: {url_info['note'] or ''}")
         print()
         
         # 测试间隔
@@ -0,0 +1,58 @@
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+class HostRateLimiter:
+    """按主机限速
+
+    同一主机的两次请求开始时间至少间隔 min_interval 秒，且同时进行的请求不超过
+    max_per_host 个；不同主机之间互不影响，取代原来全局固定的 sleep。
+    """
+
+    def __init__(self, min_interval: float = 2.0, max_per_host: int = 1):
+        self.min_interval = min_interval
+        self.max_per_host = max(1, max_per_host)
+        self._next_start = {}
+        self._semaphores = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    @asynccontextmanager
+    async def acquire(self, url: str):
+        host = self.host_of(url)
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+
+        async with semaphore:
+            # 预约下一个可用时间片，协程间无需加锁
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            start = max(now, self._next_start.get(host, 0))
+            self._next_start[host] = start + self.min_interval
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+async def iter_scheduled(items: list, capture, limiter: HostRateLimiter, concurrency: int, url_of=None):
+    """并发执行 capture(索引, 项)，按完成顺序产出 (索引, 结果)
+
+    全局并发不超过 concurrency，同一主机由 limiter 控制间隔；按 items 的顺序排队。
+    url_of(项) 给出用于限速的URL，默认项本身就是URL。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    url_of = url_of or (lambda item: item)
+
+    async def run(index, item):
+        # 先等待主机时间片，再占用全局并发槽位，避免槽位空等
+        async with limiter.acquire(url_of(item)):
+            async with semaphore:
+                return index, await capture(index, item)
+
+    tasks = [asyncio.create_task(run(i, item)) for i, item in enumerate(items)]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        for task in tasks:
+            task.cancel()
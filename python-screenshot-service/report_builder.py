@@ -0,0 +1,223 @@
+import json
+import os
+import time
+from datetime import datetime
+
+from async_io import BatchedWriter, write_json, write_text
+
+# HTML 报告顶部的汇总卡片: (字段, 名称, 单位)，带单位的数值保留一位小数
+SUMMARY_CARDS = [
+    ("total", "总计网站", ""),
+    ("success", "成功截图", ""),
+    ("failed", "失败截图", ""),
+    ("success_rate", "成功率", "%"),
+    ("total_time", "总耗时", "s"),
+    ("average_time", "平均耗时", "s"),
+    ("changed", "页面已变化", "")
+]
+
+# 追加的结果行先出现在文档末尾，由紧随其后的脚本移入所属分类；同一序号再次出现时替换旧行。
+# 分类区块是纵向 flex 容器，行按 CSS order 排列，放置一行只需 O(1)，不必查找相邻行
+REPORT_SCRIPT = """
+    <script>
+        const placedRows = {};
+        function placeRow(order, section) {
+            const row = document.currentScript.previousElementSibling;
+            row.style.order = order;
+            const previous = placedRows[order];
+            placedRows[order] = row;
+            if (previous) { previous.replaceWith(row); return; }
+            document.getElementById('section-' + section).appendChild(row);
+        }
+        function updateSummary(summary) {
+            for (const [key, value] of Object.entries(summary.cards)) {
+                document.getElementById('stat-' + key).textContent = value;
+            }
+            summary.sections.forEach((text, i) => {
+                document.getElementById('section-title-' + i).textContent = text;
+            });
+            document.getElementById('report-status').textContent = summary.status;
+        }
+    </script>"""
+
+class ReportStats:
+    """报告汇总，每条结果 O(1) 更新，不再反复扫描结果列表"""
+
+    def __init__(self, categories: list):
+        self.total = 0
+        self.success = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.elapsed_sum = 0.0
+        self.category_stats = {category: {"total": 0, "success": 0, "failed": 0} for category in categories}
+        self.changed_sites = []
+        self.failures = {category: [] for category in categories}
+
+    def add(self, result: dict):
+        category = result["category"]
+        stats = self.category_stats.setdefault(category, {"total": 0, "success": 0, "failed": 0})
+        self.total += 1
+        stats["total"] += 1
+        self.elapsed_sum += result.get("elapsed", 0)
+        if result.get("success"):
+            self.success += 1
+            stats["success"] += 1
+            if result.get("changed") is True:
+                self.changed += 1
+                self.changed_sites.append(result)
+            elif result.get("changed") is False:
+                self.unchanged += 1
+        else:
+            stats["failed"] += 1
+            self.failures.setdefault(category, []).append(result)
+
+    @property
+    def failed(self) -> int:
+        return self.total - self.success
+
+    def summary(self, total_time: float) -> dict:
+        return {
+            "total": self.total,
+            "success": self.success,
+            "failed": self.failed,
+            "success_rate": self.success / self.total * 100 if self.total else 0,
+            "total_time": total_time,
+            "average_time": self.elapsed_sum / self.total if self.total else 0,
+            "changed": self.changed,
+            "unchanged": self.unchanged
+        }
+
+class StreamingReport:
+    """增量生成的分类报告
+
+    每完成一个URL：汇总 O(1) 更新，结果追加到 <name>.results.jsonl，结果行追加到 <name>.html
+    （附带更新顶部汇总的脚本）；<name>.json 汇总快照按 snapshot_interval 节流重写。
+    运行中随时可以打开 HTML/JSON 查看进度，finalize() 只写出最终汇总和 HTML 结尾，与结果数量无关。
+    """
+
+    def __init__(self, reports_dir, name: str, session_info: dict, categories: list, expected: int,
+                 title: str, styles: str, render_row, snapshot_interval: float = 2.0):
+        self.reports_dir = str(reports_dir)
+        self.json_file = os.path.join(self.reports_dir, f"{name}.json")
+        self.html_file = os.path.join(self.reports_dir, f"{name}.html")
+        self.results_file = os.path.join(self.reports_dir, f"{name}.results.jsonl")
+        self.session_info = session_info
+        self.categories = list(categories)
+        self.expected = expected
+        self.title = title
+        self.styles = styles
+        # render_row(result, report_dir) -> 单条结果的 HTML
+        self.render_row = render_row
+        self.snapshot_interval = snapshot_interval
+
+        self.stats = ReportStats(self.categories)
+        self._sections = {category: i for i, category in enumerate(self.categories)}
+        self._html = BatchedWriter(self.html_file, max_lines=20)
+        self._results = BatchedWriter(self.results_file, max_lines=20)
+        self._started_at = time.time()
+        self._last_snapshot = 0.0
+
+    async def open(self):
+        """写出 HTML 头部（汇总卡片和空的分类区块），清空上次的结果文件"""
+        cards = "".join(
+            f'\n            <div class="stat-card"><div class="stat-value" id="stat-{key}">0</div>'
+            f'<div class="stat-label">{label}</div></div>'
+            for key, label, _ in SUMMARY_CARDS
+        )
+        sections = "".join(
+            f'\n        <div class="category-section" id="section-{i}" style="display: flex; flex-direction: column">'
+            f'\n            <div class="category-header" id="section-title-{i}">📂 {category}</div>'
+            f'\n        </div>'
+            for i, category in enumerate(self.categories)
+        )
+        await write_text(self.html_file, f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{self.title}</title>
+    <style>{self.styles}
+    </style>{REPORT_SCRIPT}
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>{self.title}</h1>
+            <p>会话ID: {self.session_info['session_id']}</p>
+            <p>开始时间: {self.session_info['start_time']}</p>
+            <p>状态: <span id="report-status">运行中</span></p>
+        </div>
+        <div class="summary">{cards}
+        </div>{sections}
+    </div>
+""")
+        await write_text(self.results_file, "")
+        await self._write_snapshot("running", time.time() - self._started_at)
+
+    async def add(self, result: dict, order: int):
+        """记录一条新完成的结果"""
+        self.stats.add(result)
+        await self._append(result, order)
+        if time.time() - self._last_snapshot >= self.snapshot_interval:
+            await self._write_snapshot("running", time.time() - self._started_at)
+
+    async def update(self, result: dict, order: int):
+        """结果补充了信息（如差异图）时重写该行；汇总不变，JSONL 中同一 order 以最后一行为准"""
+        await self._append(result, order)
+
+    async def close(self):
+        """写出缓冲中的行（批量截图中断时调用，已完成的结果仍可在报告中查看）"""
+        await self._html.close()
+        await self._results.close()
+
+    async def finalize(self, total_time: float) -> dict:
+        """写出最终汇总和 HTML 结尾，返回报告汇总"""
+        summary_script = self._summary_script("已完成", total_time)
+        await self._html.append(f"    <script>{summary_script}</script>\n</body>\n</html>")
+        await self.close()
+        return await self._write_snapshot("finished", total_time)
+
+    async def _append(self, result: dict, order: int):
+        section = self._sections[result["category"]]
+        record = dict(result, order=order)
+        await self._results.append(json.dumps(record, ensure_ascii=False))
+        row = self.render_row(result, self.reports_dir)
+        summary_script = self._summary_script(None, time.time() - self._started_at)
+        await self._html.append(
+            f'    <div data-row="{order}">{row}</div>\n'
+            f'    <script>placeRow({order}, {section}); {summary_script}</script>'
+        )
+
+    def _summary_script(self, status: str, total_time: float) -> str:
+        summary = self.stats.summary(total_time)
+        cards = {
+            key: f"{summary[key]:.1f}{unit}" if unit else str(summary[key])
+            for key, _, unit in SUMMARY_CARDS
+        }
+        sections = []
+        for category in self.categories:
+            stats = self.stats.category_stats[category]
+            rate = stats["success"] / stats["total"] * 100 if stats["total"] else 0
+            sections.append(f"📂 {category} - {stats['success']}/{stats['total']} 成功 ({rate:.1f}%)")
+        payload = {
+            "cards": cards,
+            "sections": sections,
+            "status": status or f"运行中 · 已完成 {self.stats.total}/{self.expected}"
+        }
+        # 防止内容中的 </script> 提前结束脚本
+        data = json.dumps(payload, ensure_ascii=False).replace("</", "<\\/")
+        return f"updateSummary({data});"
+
+    async def _write_snapshot(self, status: str, total_time: float) -> dict:
+        self._last_snapshot = time.time()
+        report_data = {
+            "session_info": dict(self.session_info, updated_at=datetime.now().isoformat()),
+            "status": status,
+            "expected": self.expected,
+            "summary": self.stats.summary(total_time),
+            "changed_companies": [r["name"] for r in self.stats.changed_sites],
+            "category_stats": self.stats.category_stats,
+            "results_file": os.path.basename(self.results_file)
+        }
+        await write_json(self.json_file, report_data)
+        return report_data
@@ -0,0 +1,117 @@
+import asyncio
+import re
+
+# 统计/广告/追踪服务的域名
+TRACKER_HOST_PATTERNS = [
+    r"google-analytics\.com", r"googletagmanager\.com", r"doubleclick\.net", r"googlesyndication\.com",
+    r"googleadservices\.com", r"facebook\.(com|net)/tr", r"connect\.facebook\.net", r"hotjar\.com",
+    r"segment\.(io|com)", r"clarity\.ms", r"bat\.bing\.com", r"linkedin\.com/(px|li)", r"px\.ads\.linkedin\.com",
+    r"snap\.licdn\.com", r"newrelic\.com", r"nr-data\.net", r"omtrdc\.net", r"demdex\.net", r"adobedtm\.com",
+    r"quantserve\.com", r"scorecardresearch\.com", r"mouseflow\.com", r"fullstory\.com", r"taboola\.com",
+    r"outbrain\.com", r"adsrvr\.org", r"criteo\.(com|net)", r"pardot\.com", r"marketo\.net", r"hubspot\.com",
+    r"hs-analytics\.net", r"hs-scripts\.com", r"cdn\.heapanalytics\.com", r"mixpanel\.com", r"tiqcdn\.com"
+]
+
+# 拦截配置：blocked_types 为拦截的资源类型，block_trackers 表示是否拦截追踪域名
+INTERCEPTION_PROFILES = {
+    "full": {
+        "description": "加载全部资源",
+        "blocked_types": set(),
+        "block_trackers": False
+    },
+    "no-trackers": {
+        "description": "拦截统计/广告/追踪请求",
+        "blocked_types": set(),
+        "block_trackers": True
+    },
+    "no-media": {
+        "description": "拦截追踪请求、音视频和网页字体",
+        "blocked_types": {"media", "font"},
+        "block_trackers": True
+    },
+    "text-only": {
+        "description": "只保留文档、样式和脚本，拦截图片、音视频、字体和追踪请求",
+        "blocked_types": {"image", "media", "font"},
+        "block_trackers": True
+    }
+}
+
+class RequestInterceptor:
+    """按拦截配置过滤页面请求并统计拦截情况
+
+    被拦截的请求从未发出，其大小无法得知；loaded_bytes 按浏览器记录的实际传输大小
+    （响应头 + 响应体，含分块/压缩传输）统计，可与 full 配置对比节省的流量。
+    取不到大小的请求计入 unsized_requests，此时 loaded_bytes 偏小。
+    """
+
+    def __init__(self, profile: str = "full"):
+        if profile not in INTERCEPTION_PROFILES:
+            raise ValueError(f"未知的拦截配置: {profile}（可选: {', '.join(INTERCEPTION_PROFILES)}）")
+        self.profile = profile
+        self.blocked_types = INTERCEPTION_PROFILES[profile]["blocked_types"]
+        self.block_trackers = INTERCEPTION_PROFILES[profile]["block_trackers"]
+        self._tracker_pattern = re.compile("|".join(TRACKER_HOST_PATTERNS), re.IGNORECASE)
+
+        self.blocked_requests = 0
+        self.blocked_by_type = {}
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+        self.unsized_requests = 0
+        self._pending = set()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.blocked_types) or self.block_trackers
+
+    async def apply(self, context, page=None):
+        """在上下文上注册路由；full 配置不注册，避免每个请求多一次往返"""
+        if self.active:
+            await context.route("**/*", self._handle_route)
+        if page is not None:
+            page.on("requestfinished", self._on_request_finished)
+
+    def should_block(self, request) -> str:
+        """返回拦截原因，不拦截时返回 None"""
+        if request.resource_type in self.blocked_types:
+            return request.resource_type
+        if self.block_trackers and self._tracker_pattern.search(request.url):
+            return "tracker"
+        return None
+
+    async def _handle_route(self, route):
+        reason = self.should_block(route.request)
+        if reason:
+            self.blocked_requests += 1
+            self.blocked_by_type[reason] = self.blocked_by_type.get(reason, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    def _on_request_finished(self, request):
+        self.loaded_requests += 1
+        task = asyncio.create_task(self._measure(request))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _measure(self, request):
+        try:
+            sizes = await request.sizes()
+            self.loaded_bytes += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        except Exception:
+            self.unsized_requests += 1
+
+    async def stats(self, timeout: float = 1.0) -> dict:
+        """汇总统计；先等待尚未取得大小的请求（最多 timeout 秒），超时的计入 unsized_requests"""
+        if self._pending:
+            _, pending = await asyncio.wait(set(self._pending), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            self.unsized_requests += len(pending)
+        return {
+            "profile": self.profile,
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_type": self.blocked_by_type,
+            "loaded_requests": self.loaded_requests,
+            "loaded_bytes": self.loaded_bytes,
+            "unsized_requests": self.unsized_requests
+        }
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+class ScreenshotCache:
+    """截图结果缓存
+
+    键为规范化URL + 渲染参数的哈希；命中时直接返回已有文件路径，不再启动浏览器。
+    缓存文件以硬链接（不支持时复制）方式放在 cache_dir 下，索引存放在 SQLite 中，
+    超过 ttl 的条目视为过期，总大小超过 max_bytes 时按最近最少使用淘汰。
+    """
+
+    def __init__(self, cache_dir: str, ttl: float = 3600, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    sha256 TEXT,
+                    thumbnail TEXT,
+                    preview TEXT
+                )
+            """)
+            # 旧版索引没有内容哈希和预览路径列
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+            for column in ("sha256", "thumbnail", "preview"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE entries ADD COLUMN {column} TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)")
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """规范化URL：协议和主机小写、去掉默认端口和锚点、查询参数排序"""
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").lower()
+        if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+            host = f"{host}:{parts.port}"
+        path = parts.path or "/"
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunsplit((scheme, host, path, query, ""))
+
+    @classmethod
+    def make_key(cls, url: str, render_options: dict) -> str:
+        payload = json.dumps(
+            {"url": cls.normalize_url(url), "options": render_options},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str, ttl: float = None) -> dict:
+        """查询缓存，未命中或已过期返回 None"""
+        return await asyncio.to_thread(self._get, key, self.ttl if ttl is None else ttl)
+
+    async def put(self, key: str, url: str, source_path: str, sha256: str = None, previews: dict = None) -> str:
+        """将截图文件加入缓存，返回缓存文件路径
+
+        sha256 和 previews（thumbnail/preview 路径）随条目保存，命中时直接返回，不再读取和哈希文件。
+        """
+        return await asyncio.to_thread(self._put, key, url, source_path, sha256, previews or {})
+
+    def stats(self) -> dict:
+        with self._db_lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes, "ttl": self.ttl}
+
+    def _get(self, key: str, ttl: float) -> dict:
+        now = time.time()
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT url, path, size, created_at, sha256, thumbnail, preview FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            url, path, size, created_at, sha256, thumbnail, preview = row
+            if now - created_at > ttl or not os.path.exists(path):
+                self._remove(key, path)
+                return None
+
+            with self._conn:
+                self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+
+        return {
+            "key": key, "url": url, "path": path, "size": size, "created_at": created_at,
+            "sha256": sha256, "thumbnail": thumbnail, "preview": preview
+        }
+
+    def _put(self, key: str, url: str, source_path: str, sha256: str, previews: dict) -> str:
+        ext = os.path.splitext(source_path)[1] or ".png"
+        shard_dir = os.path.join(self.cache_dir, key[:2])
+        os.makedirs(shard_dir, exist_ok=True)
+        cached_path = os.path.join(shard_dir, f"{key}{ext}")
+
+        if os.path.exists(cached_path):
+            os.remove(cached_path)
+        try:
+            os.link(source_path, cached_path)
+        except OSError:
+            shutil.copyfile(source_path, cached_path)
+
+        now = time.time()
+        size = os.path.getsize(cached_path)
+        with self._db_lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, url, path, size, created_at, last_access, "
+                    "sha256, thumbnail, preview) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, cached_path, size, now, now,
+                     sha256, previews.get("thumbnail"), previews.get("preview"))
+                )
+            self._evict(keep=key)
+        return cached_path
+
+    def _evict(self, keep: str = None):
+        """按最近最少使用淘汰，直到总大小不超过上限（调用方持有锁）"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, path, size in self._conn.execute(
+            "SELECT key, path, size FROM entries ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._remove(key, path)
+            total -= size
+
+    def _remove(self, key: str, path: str):
+        with self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.remove(path)
+        except OSError:
+            pass
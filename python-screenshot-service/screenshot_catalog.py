@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+from image_encoding import IMAGE_FORMATS
+
+# 单页最大条数
+MAX_PAGE_SIZE = 500
+
+# 导入已有截图时跳过的目录（其中的图片不是独立截图）
+SKIP_DIRS = {"cache", "thumbnails", "diffs", "blobs"}
+
+# 旧文件名中的域名部分: <域名（. 替换为 _）>_<毫秒时间戳>_<URL哈希>
+LEGACY_FILENAME = re.compile(r"^(?P<domain>.+?)_\d{10,}_[0-9a-f]{8}")
+
+def domain_of(url: str) -> str:
+    """URL 的主机名（小写，去掉 www.）"""
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(256 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ScreenshotCatalog:
+    """截图目录索引
+
+    每次截图（成功或失败）写入一条记录：URL、域名、所在会话、文件大小、内容哈希和各阶段耗时。
+    列表查询按 (created_at, id) 倒序游标分页，域名/时间/成功与否均走索引，
+    单次查询只读取一页数据，与已存储的截图总数无关。
+    """
+
+    def __init__(self, db_path: str, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS captures (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_id TEXT,
+                    url TEXT,
+                    domain TEXT,
+                    session TEXT,
+                    success INTEGER NOT NULL,
+                    format TEXT,
+                    size INTEGER,
+                    sha256 TEXT,
+                    timings TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_captures_created ON captures (created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_captures_domain ON captures (domain, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_captures_success ON captures (success, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_captures_file ON captures (file_id)")
+
+    async def record(self, result: dict, session: str) -> int:
+        """记录一次截图结果，返回记录ID"""
+        return await asyncio.to_thread(self._record, result, session)
+
+    async def list(self, limit: int = 50, cursor: str = None, domain: str = None,
+                   since: float = None, until: float = None, success: bool = None) -> dict:
+        """按时间倒序分页查询，返回 {"items": [...], "next_cursor": ...}
+
+        cursor 为上一页返回的 next_cursor；since/until 为 Unix 时间戳（until 不含）。
+        """
+        return await asyncio.to_thread(self._list, limit, cursor, domain, since, until, success)
+
+    async def sha256_of(self, path: str, size: int) -> str:
+        """已记录的文件内容哈希；没有记录或大小不符时返回 None"""
+        return await asyncio.to_thread(self._sha256_of, path, size)
+
+    def session_of(self, directory: str):
+        """目录所属的会话（相对根目录的第一级子目录），根目录本身返回 None"""
+        rel_dir = os.path.relpath(directory, self.root_dir)
+        return None if rel_dir == "." or rel_dir.startswith("..") else rel_dir.split(os.sep)[0]
+
+    async def import_existing(self) -> int:
+        """目录为空时导入磁盘上已有的截图（含各 session_* 子目录），返回导入数量"""
+        return await asyncio.to_thread(self._import_existing)
+
+    def _record(self, result: dict, session: str) -> int:
+        path = result.get("path")
+        file_id = os.path.relpath(path, self.root_dir) if path else None
+        row = (
+            file_id,
+            result.get("url"),
+            domain_of(result["url"]) if result.get("url") else None,
+            session,
+            1 if result.get("success") else 0,
+            result.get("format"),
+            result.get("encoded_size"),
+            result.get("sha256"),
+            json.dumps(result["timings"]) if result.get("timings") else None,
+            result.get("error"),
+            time.time()
+        )
+        with self._db_lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO captures (file_id, url, domain, session, success, format, size, sha256, "
+                "timings, error, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+            return cursor.lastrowid
+
+    def _sha256_of(self, path: str, size: int) -> str:
+        file_id = os.path.relpath(os.path.realpath(path), os.path.realpath(self.root_dir))
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT sha256 FROM captures WHERE file_id = ? AND size = ? AND sha256 IS NOT NULL "
+                "ORDER BY id DESC LIMIT 1",
+                (file_id, size)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _list(self, limit, cursor, domain, since, until, success) -> dict:
+        limit = max(1, min(limit or 50, MAX_PAGE_SIZE))
+        clauses, params = [], []
+        if domain:
+            clauses.append("domain = ?")
+            params.append(domain_of(f"http://{domain}"))
+        if success is not None:
+            clauses.append("success = ?")
+            params.append(1 if success else 0)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if cursor:
+            cursor_time, cursor_id = self._parse_cursor(cursor)
+            clauses.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params.extend([cursor_time, cursor_time, cursor_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, file_id, url, domain, session, success, format, size, sha256, timings, error, "
+                f"created_at FROM captures {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1][11]!r}:{rows[-1][0]}"
+        return {"items": [self._row_to_dict(row) for row in rows], "next_cursor": next_cursor}
+
+    @staticmethod
+    def _parse_cursor(cursor: str) -> tuple:
+        try:
+            created_at, row_id = cursor.split(":", 1)
+            return float(created_at), int(row_id)
+        except ValueError:
+            raise ValueError(f"无效的游标: {cursor}")
+
+    @staticmethod
+    def _row_to_dict(row) -> dict:
+        (row_id, file_id, url, domain, session, success, fmt, size, sha256, timings, error, created_at) = row
+        return {
+            "id": row_id,
+            "file_id": file_id,
+            "filename": os.path.basename(file_id) if file_id else None,
+            "url": url,
+            "domain": domain,
+            "session": session,
+            "success": bool(success),
+            "format": fmt,
+            "size": size,
+            "sha256": sha256,
+            "timings": json.loads(timings) if timings else None,
+            "error": error,
+            "created": datetime.fromtimestamp(created_at).isoformat()
+        }
+
+    def _import_existing(self) -> int:
+        with self._db_lock:
+            if self._conn.execute("SELECT 1 FROM captures LIMIT 1").fetchone():
+                return 0
+
+        extensions = {info["ext"] for info in IMAGE_FORMATS.values()}
+        rows = []
+        for dirpath, dirnames, filenames in os.walk(self.root_dir):
+            # 缓存目录、分块截图的图块、缩略图/首屏预览、差异图和内容寻址存储的对象不是独立截图
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.endswith("_tiles")]
+            session = self.session_of(dirpath)
+            for filename in filenames:
+                ext = os.path.splitext(filename)[1].lower()
+                if ext not in extensions:
+                    continue
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                match = LEGACY_FILENAME.match(filename)
+                domain = match.group("domain").replace("_", ".") if match else None
+                fmt = next(name for name, info in IMAGE_FORMATS.items() if info["ext"] == ext)
+                rows.append((
+                    os.path.relpath(path, self.root_dir), None, domain, session, 1, fmt,
+                    stat.st_size, None, None, None, stat.st_mtime
+                ))
+
+        if rows:
+            with self._db_lock, self._conn:
+                self._conn.executemany(
+                    "INSERT INTO captures (file_id, url, domain, session, success, format, size, sha256, "
+                    "timings, error, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        return len(rows)
@@ -2,9 +2,127 @@ import asyncio
 import os
 import hashlib
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from playwright.async_api import async_playwright
 from playwright_stealth import stealth_async
+from async_io import write_bytes
+from browser_pool import BrowserPool
+from rate_limit import HostRateLimiter, iter_scheduled
+from screenshot_cache import ScreenshotCache
+from screenshot_catalog import ScreenshotCatalog, sha256_file
+from thumbnails import PreviewGenerator
+from change_detection import PageHashIndex, compare_hashes, link_to_previous, page_hashes
+from blob_store import BlobStore
+from popup_handler import dismiss_popups
+from popup_memory import PopupSelectorMemory
+from page_readiness import PageReadiness, READINESS_INIT_SCRIPT, DEFAULT_IGNORE_PATTERNS
+from request_interception import RequestInterceptor
+from image_encoding import IMAGE_FORMATS, Image, encode_image, normalize_format
+from tiled_capture import capture_tiled
+
+# 浏览器启动参数
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--disable-web-security',
+    '--ignore-certificate-errors',
+    '--disable-popup-blocking',
+    '--disable-extensions',
+    '--no-first-run',
+    '--disable-default-apps',
+    '--disable-features=VizDisplayCompositor'
+]
+
+# 不影响渲染结果的参数，不参与缓存键
+NON_RENDER_OPTIONS = {"cache", "cache_ttl", "save", "detect_changes", "change_mask"}
+
+# 就绪探针渲染的内联页面（不访问网络）
+PROBE_URL = "data:text/html,<!doctype html><html><body style='margin:0'><h1>probe</h1></body></html>"
+
+# 自适应懒加载：loading=lazy 的图片直接改为立即加载，按视口高度滚动，
+# 每一步只等待新触发的图片加载完成，到底部且无待加载图片即结束
+LAZY_LOAD_SCRIPT = """
+async ({ budgetMs, settleMs }) => {
+    const start = performance.now();
+    const elapsed = () => performance.now() - start;
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+    const pageHeight = () => Math.max(
+        document.body ? document.body.scrollHeight : 0,
+        document.documentElement.scrollHeight
+    );
+    const pendingImages = () => Array.from(document.images).filter(img => img.src && !img.complete).length;
+    // 滚动阶段不超过 budgetMs，最后的等待阶段另有 settleMs，总时长不超过两者之和
+    const waitForImages = async (limitMs, deadlineMs) => {
+        const until = Math.min(performance.now() + limitMs, start + deadlineMs);
+        while (pendingImages() > 0 && performance.now() < until) {
+            await sleep(50);
+        }
+        return pendingImages() === 0;
+    };
+
+    let eagerized = 0;
+    document.querySelectorAll('img[loading="lazy"], iframe[loading="lazy"]').forEach(el => {
+        el.loading = 'eager';
+        eagerized++;
+    });
+
+    const step = Math.max(window.innerHeight, 200);
+    let y = 0;
+    let steps = 0;
+    let timedOut = false;
+    while (y + window.innerHeight < pageHeight()) {
+        if (elapsed() >= budgetMs) {
+            timedOut = true;
+            break;
+        }
+        y += step;
+        window.scrollTo(0, y);
+        steps++;
+        // 给 IntersectionObserver 一帧时间触发加载
+        await sleep(50);
+        await waitForImages(500, budgetMs);
+    }
+
+    window.scrollTo(0, 0);
+    const settled = await waitForImages(settleMs, budgetMs + settleMs);
+
+    return {
+        elapsed_ms: Math.round(elapsed()),
+        steps,
+        height: pageHeight(),
+        eagerized,
+        pending_images: pendingImages(),
+        timed_out: timedOut || !settled
+    };
+}
+"""
+
+# 反检测脚本
+STEALTH_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined,
+    });
+    
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5],
+    });
+    
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['en-US', 'en'],
+    });
+    
+    window.chrome = {
+        runtime: {},
+    };
+    
+    Object.defineProperty(navigator, 'permissions', {
+        get: () => ({
+            query: () => Promise.resolve({ state: 'granted' }),
+        }),
+    });
+"""
 
 class ScreenshotService:
     def __init__(self, screenshot_dir: str):
@@ -22,10 +140,253 @@ class ScreenshotService:
                 'Accept', 'Accept all', 'Allow all', 'I agree', 'Got it', 'Close',
                 'Reject all', 'Deny all', 'Allow selection', '同意', '接受', '关闭',
                 'OK', 'Continue', 'Agree and continue', 'Accept cookies'
-            ]
+            ],
+            "browser_pool_size": 2,  # 常驻浏览器进程数
+            "health_check_interval": 30,  # 浏览器健康检查间隔（秒）
+            "batch_concurrency": 6,  # 批量截图默认并发数
+            "host_min_interval": 2.0,  # 同一主机两次请求的最小间隔（秒）
+            "cache_dir": os.path.join("screenshots", "cache"),  # 截图缓存目录（所有服务和批量脚本共享）
+            "cache_ttl": 3600,  # 截图缓存有效期（秒）
+            "cache_max_bytes": 2 * 1024 ** 3,  # 截图缓存磁盘上限
+            "popup_memory_path": os.path.join("screenshots", "popup_selectors.json"),  # 各域名弹窗选择器记录（跨运行共享）
+            "lazy_load_budget_ms": 10000,  # 懒加载滚动总时间预算
+            "lazy_load_settle_ms": 1000,  # 滚动结束后等待图片完成的最长时间
+            "readiness_timeout_ms": 15000,  # 页面就绪等待上限
+            "readiness_quiet_ms": 500,  # 各就绪信号需保持静默的时间
+            "readiness_ignore_patterns": list(DEFAULT_IGNORE_PATTERNS),  # 就绪检测忽略的请求（统计/追踪/长轮询）
+            "block_profile": "full",  # 默认请求拦截配置（full / no-trackers / no-media / text-only）
+            "image_quality": 80,  # JPEG/WebP/AVIF 默认质量
+            "preview_workers": 2,  # 生成缩略图/首屏预览的进程数
+            "catalog_path": os.path.join("screenshots", "catalog.db"),  # 截图目录索引（所有服务和批量脚本共享）
+            "catalog_root": "screenshots",  # 目录索引中 file_id 的相对根目录
+            "change_index_path": os.path.join("screenshots", "page_hashes.db"),  # 各URL上次截图的感知哈希（跨运行共享）
+            "change_threshold": 10,  # 分块哈希（256 位）汉明距离超过该值视为变化
+            "blob_store": False,  # 是否使用内容寻址存储（会话目录只保存清单）
+            "blob_store_dir": os.path.join("screenshots", "blobs"),  # 内容寻址存储目录（跨运行共享）
+            "probe_timeout_ms": 10000  # 就绪探针单次渲染超时
         }
+        
+        # 常驻浏览器池，首次截图时自动启动，也可由 start() 预先启动
+        self.browser_pool = BrowserPool(
+            size=self.config["browser_pool_size"],
+            headless=True,
+            launch_args=BROWSER_ARGS,
+            health_check_interval=self.config["health_check_interval"]
+        )
+        
+        # 截图结果缓存，同一URL + 渲染参数在有效期内直接复用已有文件（跨会话、跨脚本共享）
+        self.cache = ScreenshotCache(
+            self.config["cache_dir"],
+            ttl=self.config["cache_ttl"],
+            max_bytes=self.config["cache_max_bytes"]
+        )
+        
+        # 截图目录索引，记录每次截图供列表查询
+        self.catalog = ScreenshotCatalog(self.config["catalog_path"], self.config["catalog_root"])
+        
+        # 缩略图和首屏预览，截图完成后在进程池中后台生成
+        self.previews = PreviewGenerator(
+            os.path.join(screenshot_dir, "thumbnails"),
+            workers=self.config["preview_workers"],
+            fold_height=self.config["viewport"]["height"]
+        )
+        self._preview_tasks = set()
+        
+        # 内容寻址存储，config["blob_store"] 开启时字节相同的截图只存一份
+        self.blob_store = BlobStore(self.config["blob_store_dir"])
+        
+        # 感知哈希索引，用于判断页面相对上次截图是否变化
+        self.change_index = PageHashIndex(self.config["change_index_path"])
+        
+        # 按域名记住实际关闭弹窗的选择器
+        self.popup_memory = PopupSelectorMemory(self.config["popup_memory_path"])
+    
+    async def start(self):
+        """启动浏览器池；截图目录索引为空时导入已有截图"""
+        imported = await self.catalog.import_existing()
+        if imported:
+            print(f"📚 已导入 {imported} 个已有截图到目录索引")
+        await self.browser_pool.start()
+    
+    async def probe(self, contexts: int = None) -> dict:
+        """就绪探针：通过常驻浏览器池渲染内联 data: 页面并截图（不访问网络、不写文件）
+        
+        同时打开 contexts 个上下文（默认每个浏览器一个），顺带预热浏览器进程和截图路径，
+        之后的批量截图不再付出首次启动开销。
+        """
+        contexts = max(1, contexts or self.browser_pool.size)
+        timeout = self.config["probe_timeout_ms"]
+        start = time.time()
+        
+        async def render():
+            async with self.open_context({}) as context:
+                page = await context.new_page()
+                await page.goto(PROBE_URL, wait_until='load', timeout=timeout)
+                await page.screenshot(type='png', timeout=timeout)
+        
+        try:
+            # 只启动浏览器池，不重复导入截图目录（/ready 会反复调用）
+            await self.browser_pool.start()
+            await asyncio.gather(*(render() for _ in range(contexts)))
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "elapsed_ms": round((time.time() - start) * 1000)
+            }
+        return {
+            "success": True,
+            "contexts": contexts,
+            "browsers": self.browser_pool.size,
+            "elapsed_ms": round((time.time() - start) * 1000)
+        }
+    
+    async def close(self):
+        """关闭浏览器池，等待后台预览生成完成"""
+        await self.browser_pool.stop()
+        await self.blob_store.flush()
+        if self._preview_tasks:
+            await asyncio.gather(*self._preview_tasks, return_exceptions=True)
+        await asyncio.to_thread(self.previews.shutdown)
+    
+    async def attach_previews(self, result: dict):
+        """为成功的截图安排后台生成缩略图和首屏预览，结果中先写入两者路径"""
+        path = result.get("path")
+        if not (result.get("success") and path and self.previews.available) or path.endswith(".json"):
+            return
+        
+        sha256 = result.get("sha256") or await asyncio.to_thread(sha256_file, path)
+        result["sha256"] = sha256
+        result.update(self.previews.paths_for(sha256))
+        
+        task = asyncio.create_task(self.previews.generate(path, sha256))
+        self._preview_tasks.add(task)
+        task.add_done_callback(self._on_preview_done)
     
-    def generate_filename(self, url: str) -> str:
+    async def detect_change(self, result: dict, options: dict):
+        """与同一URL上次截图比较感知哈希
+        
+        未变化时新文件替换为指向上次截图的硬链接（不占新空间），result["change"]["changed"] 为 False；
+        没有可比较的上次截图时为 None。
+        """
+        path = result.get("path")
+        if not (result.get("success") and path and Image is not None) or path.endswith(".json"):
+            return
+        
+        url = result["url"]
+        mask = options.get("change_mask")
+        try:
+            current = await asyncio.to_thread(page_hashes, path, mask, self.config["viewport"]["height"])
+            previous = await self.change_index.get(url, mask)
+        except Exception as e:
+            print(f"⚠️ 感知哈希计算失败: {e}")
+            return
+        
+        if previous is None or not await asyncio.to_thread(os.path.exists, previous["path"]):
+            result["change"] = {"changed": None, "previous": None}
+            await self.change_index.update(url, path, result.get("sha256"), current, mask)
+            return
+        
+        comparison = compare_hashes(previous, current, self.config["change_threshold"])
+        comparison["previous"] = previous["path"]
+        result["change"] = comparison
+        
+        if comparison["changed"]:
+            print(f"🔄 页面已变化: {url}")
+            await self.change_index.update(url, path, result.get("sha256"), current, mask)
+        elif result.get("blob"):
+            # 内容寻址存储的文件名即内容哈希，不能用硬链接覆盖，直接引用上次截图；
+            # 本次写入的文件可能被其他截图共用，不在这里删除，由 collect_garbage 按清单回收
+            print(f"♻️ 页面未变化，引用上次截图: {previous['path']}")
+            comparison["stored_as_reference"] = True
+            result["path"] = previous["path"]
+            result["sha256"] = previous["sha256"]
+            result["encoded_size"] = await asyncio.to_thread(os.path.getsize, previous["path"])
+        elif await asyncio.to_thread(link_to_previous, previous["path"], path):
+            # 保留原基准哈希，避免细微变化逐次累积而检测不到
+            print(f"♻️ 页面未变化，引用上次截图: {previous['path']}")
+            comparison["stored_as_reference"] = True
+            result["sha256"] = previous["sha256"]
+            result["encoded_size"] = await asyncio.to_thread(os.path.getsize, path)
+            await self.change_index.update(url, path, previous["sha256"], previous, mask)
+    
+    def manifest_entry(self, result: dict) -> dict:
+        """会话清单中的一条记录"""
+        return {
+            "filename": result.get("filename"),
+            "url": result.get("url"),
+            "path": result.get("path"),
+            "sha256": result.get("sha256"),
+            "format": result.get("format"),
+            "size": result.get("encoded_size"),
+            "changed": (result.get("change") or {}).get("changed"),
+            "timestamp": result.get("timestamp")
+        }
+    
+    def _on_preview_done(self, task):
+        self._preview_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"⚠️ 缩略图生成失败: {task.exception()}")
+    
+    def get_context_options(self, options: dict = None) -> dict:
+        """BrowserContext 创建参数"""
+        options = options or {}
+        context_options = {
+            "viewport": self.config["viewport"],
+            "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            "locale": 'en-US',
+            "timezone_id": 'America/New_York',
+            "ignore_https_errors": True,
+            "extra_http_headers": {
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Accept-Encoding': 'gzip, deflate',
+                'DNT': '1',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1'
+            }
+        }
+        
+        # 拦截请求时阻止 Service Worker，否则其发起的请求会绕过路由
+        if options.get("block_profile", self.config["block_profile"]) != "full":
+            context_options["service_workers"] = "block"
+        
+        return context_options
+    
+    @asynccontextmanager
+    async def open_context(self, options: dict):
+        """获取一个全新的 BrowserContext
+        
+        默认从常驻浏览器池分配；请求的 headless 模式与池不一致时临时启动独立浏览器。
+        """
+        headless = options.get('headless', True)
+        
+        if headless == self.browser_pool.headless:
+            async with self.browser_pool.context(**self.get_context_options(options)) as context:
+                yield context
+            return
+        
+        playwright = None
+        browser = None
+        context = None
+        try:
+            playwright = await async_playwright().start()
+            browser = await playwright.chromium.launch(headless=headless, args=BROWSER_ARGS)
+            print(f"✅ 独立浏览器已启动 (headless={headless})")
+            context = await browser.new_context(**self.get_context_options(options))
+            yield context
+        finally:
+            try:
+                if context:
+                    await context.close()
+                if browser:
+                    await browser.close()
+                if playwright:
+                    await playwright.stop()
+            except Exception as e:
+                print(f'资源清理异常: {e}')
+    
+    def generate_filename(self, url: str, ext: str = ".png") -> str:
         """生成唯一文件名"""
         timestamp = int(time.time() * 1000)
         url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
@@ -33,196 +394,315 @@ class ScreenshotService:
         try:
             from urllib.parse import urlparse
             domain = urlparse(url).netloc.replace('www.', '').replace('.', '_')
-            return f"{domain}_{timestamp}_{url_hash}.png"
+            return f"{domain}_{timestamp}_{url_hash}{ext}"
         except:
-            return f"screenshot_{timestamp}_{url_hash}.png"
+            return f"screenshot_{timestamp}_{url_hash}{ext}"
     
     async def close_popups(self, page):
-        """关闭弹窗"""
+        """关闭弹窗：优先尝试该域名记住的选择器，未命中再页面内单次扫描打分"""
         try:
-            await page.wait_for_timeout(2000)
+            remembered = await self.popup_memory.get(page.url)
+            match = await dismiss_popups(page, self.config["popup_texts"], remembered)
             
-            for text in self.config["popup_texts"]:
-                try:
-                    # 多种选择器策略
-                    selectors = [
-                        f'button:has-text("{text}")',
-                        f'a:has-text("{text}")',
-                        f'div[role="button"]:has-text("{text}")',
-                        f'span:has-text("{text}")',
-                        f'[data-testid*="accept"]',
-                        f'[id*="accept"]',
-                        f'[class*="accept"]',
-                        f'[class*="cookie"]',
-                        f'[class*="consent"]'
-                    ]
-                    
-                    for selector in selectors:
-                        try:
-                            element = await page.query_selector(selector)
-                            if element:
-                                await element.click(timeout=3000)
-                                print(f"✅ 关闭弹窗: {text}")
-                                await page.wait_for_timeout(1000)
-                                return True
-                        except:
-                            continue
-                            
-                except Exception as e:
-                    continue
+            if match:
+                source = "已记住" if match.get("remembered") else "扫描"
+                print(f"✅ 关闭弹窗 ({source}): {match['text']} ({match['selector']})")
+                await self.popup_memory.record_success(page.url, match)
+                await page.wait_for_timeout(500)
+                return match
             
+            if remembered:
+                await self.popup_memory.record_miss(page.url)
             return False
         except Exception as error:
             print(f"⚠️ 弹窗处理异常: {error}")
             return False
     
-    async def handle_lazy_loading(self, page):
-        """处理懒加载"""
+    async def handle_lazy_loading(self, page, options: dict = None) -> dict:
+        """自适应懒加载：按视口高度滚动，图片加载完即结束，总耗时受预算限制
+        
+        返回统计信息（耗时、滚动次数、页面高度、未完成图片数、是否超出预算）。
+        """
+        options = options or {}
+        if options.get("lazy_load") is False:
+            return {"skipped": True}
+        
+        budget_ms = options.get("lazy_load_budget_ms", self.config["lazy_load_budget_ms"])
+        settle_ms = options.get("lazy_load_settle_ms", self.config["lazy_load_settle_ms"])
         try:
-            await page.evaluate("""
-                () => {
-                    return new Promise((resolve) => {
-                        let totalHeight = 0;
-                        const distance = 100;
-                        const timer = setInterval(() => {
-                            const scrollHeight = document.body.scrollHeight;
-                            window.scrollBy(0, distance);
-                            totalHeight += distance;
-                            
-                            if (totalHeight >= scrollHeight) {
-                                clearInterval(timer);
-                                window.scrollTo(0, 0);
-                                setTimeout(resolve, 1000);
-                            }
-                        }, 100);
-                    });
-                }
-            """)
+            stats = await page.evaluate(LAZY_LOAD_SCRIPT, {"budgetMs": budget_ms, "settleMs": settle_ms})
+            if stats["timed_out"]:
+                print(f"⚠️ 懒加载超出预算 {budget_ms}ms，仍有 {stats['pending_images']} 张图片未完成")
+            return stats
         except Exception as e:
             print(f"⚠️ 懒加载处理异常: {e}")
+            return {"error": str(e)}
+    
+    async def capture_image(self, page, options: dict) -> dict:
+        """截取整页并按 options 中的 format/quality/max_height 编码
+        
+        max_height 通过裁剪区域交给浏览器处理，避免渲染超出部分；
+        非 PNG 格式在线程池中重新编码，不阻塞事件循环。
+        """
+        fmt = normalize_format(options.get("format"))
+        quality = options.get("quality", self.config["image_quality"])
+        max_height = options.get("max_height")
+        
+        screenshot_options = {"full_page": True, "animations": "disabled"}
+        if max_height:
+            page_height = await page.evaluate(
+                "() => Math.max(document.body ? document.body.scrollHeight : 0, document.documentElement.scrollHeight)"
+            )
+            if page_height > max_height:
+                screenshot_options["clip"] = {
+                    "x": 0, "y": 0,
+                    "width": self.config["viewport"]["width"], "height": max_height
+                }
+        
+        if fmt == "jpeg" and Image is None:
+            # 没有 Pillow 时使用浏览器原生 JPEG 编码
+            data = await page.screenshot(type="jpeg", quality=quality, **screenshot_options)
+            return {"data": data, "format": fmt, "raw_size": None, "encoded_size": len(data)}
+        
+        raw = await page.screenshot(type="png", **screenshot_options)
+        data = raw if fmt == "png" else await asyncio.to_thread(encode_image, raw, fmt, quality)
+        return {"data": data, "format": fmt, "raw_size": len(raw), "encoded_size": len(data)}
+    
+    @staticmethod
+    def _sha256(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+    
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    @staticmethod
+    def format_of(path: str) -> str:
+        """按扩展名推断图片格式"""
+        ext = os.path.splitext(path)[1].lower()
+        return next((fmt for fmt, info in IMAGE_FORMATS.items() if info["ext"] == ext), "png")
     
-    async def take_screenshot(self, url: str, options: dict = None) -> dict:
-        """核心截图函数"""
+    def render_signature(self, options: dict) -> dict:
+        """影响渲染结果的全部参数，用于生成缓存键"""
+        signature = {k: v for k, v in options.items() if k not in NON_RENDER_OPTIONS}
+        signature.setdefault("headless", True)
+        signature.setdefault("full_page", True)
+        signature["viewport"] = self.config["viewport"]
+        return signature
+    
+    async def take_screenshot(self, url: str, options: dict = None, include_data: bool = False) -> dict:
+        """核心截图函数
+        
+        options["cache"] 为 False 时跳过缓存，options["cache_ttl"] 可覆盖缓存有效期；
+        options["detect_changes"] 为 True 时总是重新截图（结果仍写入缓存），才能与上次截图比较；
+        options["save"] 为 False 时不写盘（也不进入缓存）。
+        include_data 为 True 时结果中附带图片字节（data），供接口直接返回图片。
+        """
         if options is None:
             options = {}
         
-        playwright = None
-        browser = None
-        context = None
-        page = None
+        cache_key = None
+        # 分块清单由多个文件组成，不进入缓存
+        if options.get("cache", True) and options.get("tile_output") != "manifest":
+            cache_key = self.cache.make_key(url, self.render_signature(options))
+            entry = None
+            # 变化检测需要重新渲染，不读取缓存
+            if not options.get("detect_changes"):
+                try:
+                    entry = await self.cache.get(cache_key, options.get("cache_ttl"))
+                except Exception as e:
+                    print(f"⚠️ 缓存读取异常: {e}")
+            
+            if entry:
+                print(f"⚡ 缓存命中: {url}")
+                result = {
+                    "success": True,
+                    "filename": os.path.basename(entry["path"]),
+                    "path": entry["path"],
+                    "url": url,
+                    "format": self.format_of(entry["path"]),
+                    "cached": True,
+                    "timestamp": datetime.now().isoformat()
+                }
+                if include_data:
+                    result["data"] = await asyncio.to_thread(self._read_file, entry["path"])
+                if entry["sha256"]:
+                    result["sha256"] = entry["sha256"]
+                if entry["thumbnail"]:
+                    # 写入缓存时已安排生成预览，命中时不再读取和哈希整个文件
+                    result["thumbnail"], result["preview"] = entry["thumbnail"], entry["preview"]
+                else:
+                    await self.attach_previews(result)
+                return result
+        
+        result = await self._capture(url, options, include_data)
         
+        if options.get("detect_changes"):
+            await self.detect_change(result, options)
+        
+        if result.get("blob"):
+            try:
+                await self.blob_store.append_manifest(self.screenshot_dir, self.manifest_entry(result))
+            except Exception as e:
+                print(f"⚠️ 会话清单写入异常: {e}")
+        
+        try:
+            result["catalog_id"] = await self.catalog.record(result, self.catalog.session_of(self.screenshot_dir))
+        except Exception as e:
+            print(f"⚠️ 目录索引写入异常: {e}")
+        await self.attach_previews(result)
+        
+        if cache_key and result.get("success") and result.get("path"):
+            try:
+                await self.cache.put(cache_key, url, result["path"], result.get("sha256"), {
+                    "thumbnail": result.get("thumbnail"),
+                    "preview": result.get("preview")
+                })
+            except Exception as e:
+                print(f"⚠️ 缓存写入异常: {e}")
+        
+        return result
+    
+    async def _capture(self, url: str, options: dict, include_data: bool = False) -> dict:
+        """启动浏览器上下文完成一次实际截图"""
         print(f"🔄 开始截图: {url}")
         
+        # 各阶段耗时（毫秒）和诊断信息，便于按站点调优
+        timings = {}
+        diagnostics = {}
+        save = options.get("save", True)
+        # 写入内容寻址存储时的记录
+        blob = None
+        sha256 = None
+        capture_start = time.monotonic()
+        stage_start = capture_start
+        
+        def mark(stage):
+            nonlocal stage_start
+            now = time.monotonic()
+            timings[f"{stage}_ms"] = round((now - stage_start) * 1000)
+            stage_start = now
+        
         try:
-            playwright = await async_playwright().start()
-            print("✅ Playwright已启动")
-            
-            # 启动浏览器，使用stealth模式
-            browser = await playwright.chromium.launch(
-                headless=options.get('headless', True),
-                args=[
-                    '--no-sandbox',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--disable-web-security',
-                    '--ignore-certificate-errors',
-                    '--disable-popup-blocking',
-                    '--disable-extensions',
-                    '--no-first-run',
-                    '--disable-default-apps',
-                    '--disable-features=VizDisplayCompositor'
-                ]
-            )
-            print("✅ 浏览器已启动")
-            
-            # 创建上下文
-            context = await browser.new_context(
-                viewport=self.config["viewport"],
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='en-US',
-                timezone_id='America/New_York',
-                ignore_https_errors=True,
-                extra_http_headers={
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1'
-                }
-            )
-            
-            # 添加反检测脚本
-            await context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined,
-                });
+            async with self.open_context(options) as context:
+                # 添加反检测脚本和就绪检测脚本
+                await context.add_init_script(STEALTH_INIT_SCRIPT)
+                await context.add_init_script(READINESS_INIT_SCRIPT)
                 
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5],
-                });
+                page = await context.new_page()
+                readiness = PageReadiness(
+                    page,
+                    ignore_patterns=self.config["readiness_ignore_patterns"],
+                    quiet_ms=self.config["readiness_quiet_ms"]
+                )
+                readiness.attach()
                 
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['en-US', 'en'],
-                });
+                # 按拦截配置过滤请求
+                interceptor = RequestInterceptor(options.get("block_profile", self.config["block_profile"]))
+                await interceptor.apply(context, page)
+                print("✅ 页面已创建")
                 
-                window.chrome = {
-                    runtime: {},
-                };
+                # 应用stealth插件
+                try:
+                    await stealth_async(page)
+                    print("✅ Stealth插件已应用")
+                except Exception as e:
+                    print(f"⚠️ Stealth插件应用失败: {e}")
+                mark("setup")
                 
-                Object.defineProperty(navigator, 'permissions', {
-                    get: () => ({
-                        query: () => Promise.resolve({ state: 'granted' }),
-                    }),
-                });
-            """)
-            
-            page = await context.new_page()
-            print("✅ 页面已创建")
-            
-            # 应用stealth插件
-            try:
-                await stealth_async(page)
-                print("✅ Stealth插件已应用")
-            except Exception as e:
-                print(f"⚠️ Stealth插件应用失败: {e}")
-            
-            print(f"🔄 正在访问: {url}")
-            
-            # 访问页面
-            await page.goto(url, wait_until='domcontentloaded', timeout=self.config["timeout"])
-            
-            # 关闭弹窗
-            await self.close_popups(page)
-            
-            # 等待网络稳定
-            try:
-                await page.wait_for_load_state('networkidle', timeout=15000)
-            except:
-                print('⚠️ 网络未完全稳定，继续截图')
-            
-            # 处理懒加载
-            await self.handle_lazy_loading(page)
-            
-            # 生成截图
-            filename = self.generate_filename(url)
-            screenshot_path = os.path.join(self.screenshot_dir, filename)
-            
-            await page.screenshot(
-                path=screenshot_path,
-                full_page=True,
-                animations='disabled'
-            )
-            
-            print(f"✅ 截图成功: {screenshot_path}")
-            
-            return {
-                "success": True,
-                "filename": filename,
-                "path": screenshot_path,
-                "url": url,
-                "timestamp": datetime.now().isoformat()
-            }
+                print(f"🔄 正在访问: {url}")
+                
+                # 访问页面
+                await page.goto(url, wait_until='domcontentloaded', timeout=self.config["timeout"])
+                mark("navigation")
+                
+                # 等待页面就绪（DOM/图片/字体/布局/网络多信号组合）
+                ready = await readiness.wait(options.get("readiness_timeout_ms", self.config["readiness_timeout_ms"]))
+                diagnostics["readiness"] = ready
+                if not ready["ready"]:
+                    print(f"⚠️ 页面未完全就绪 ({ready['elapsed_ms']}ms)，阻塞信号: {', '.join(ready['blocked_by'])}，继续截图")
+                mark("readiness")
+                
+                # 关闭弹窗（此时弹窗脚本已加载，无需固定等待）
+                popup = await self.close_popups(page)
+                diagnostics["popup"] = popup or None
+                mark("popups")
+                
+                # 处理懒加载
+                diagnostics["lazy_load"] = await self.handle_lazy_loading(page, options)
+                mark("lazy_load")
+                
+                # 生成截图
+                if options.get("tiled"):
+                    # 超长页面分块截取，边截边写盘
+                    image = await capture_tiled(
+                        page,
+                        self.screenshot_dir,
+                        os.path.splitext(self.generate_filename(url))[0],
+                        width=self.config["viewport"]["width"],
+                        tile_height=options.get("tile_height", self.config["viewport"]["height"]),
+                        max_height=options.get("max_height"),
+                        mode=options.get("tile_output", "stitch"),
+                        fmt=normalize_format(options.get("format")),
+                        quality=options.get("quality", self.config["image_quality"])
+                    )
+                    screenshot_path = image["path"]
+                    filename = os.path.relpath(screenshot_path, self.screenshot_dir)
+                    diagnostics["tiles"] = {"count": image["tiles"], "height": image["height"]}
+                    mark("screenshot")
+                    sha256 = await asyncio.to_thread(sha256_file, screenshot_path)
+                    
+                    # 拼接图只能先落盘，不保存时读回后删除
+                    stitched = options.get("tile_output", "stitch") == "stitch"
+                    if include_data and stitched:
+                        image["data"] = await asyncio.to_thread(self._read_file, screenshot_path)
+                    if stitched and not save:
+                        await asyncio.to_thread(os.remove, screenshot_path)
+                        filename = screenshot_path = None
+                    elif stitched and self.config["blob_store"]:
+                        blob = await self.blob_store.put_file(screenshot_path, sha256)
+                        screenshot_path = blob["path"]
+                else:
+                    image = await self.capture_image(page, options)
+                    mark("screenshot")
+                    
+                    if save:
+                        filename = self.generate_filename(url, IMAGE_FORMATS[image["format"]]["ext"])
+                        if self.config["blob_store"]:
+                            blob = await self.blob_store.put_bytes(image["data"], IMAGE_FORMATS[image["format"]]["ext"])
+                            screenshot_path, sha256 = blob["path"], blob["sha256"]
+                        else:
+                            screenshot_path = os.path.join(self.screenshot_dir, filename)
+                            await write_bytes(screenshot_path, image["data"])
+                        mark("write")
+                    else:
+                        filename = screenshot_path = None
+                    if sha256 is None:
+                        sha256 = await asyncio.to_thread(self._sha256, image["data"])
+                diagnostics["interception"] = await interceptor.stats()
+                timings["total_ms"] = round((time.monotonic() - capture_start) * 1000)
+                
+                print(f"✅ 截图成功: {screenshot_path or '未保存'} ({timings['total_ms']}ms)")
+                
+                result = {
+                    "success": True,
+                    "filename": filename,
+                    "path": screenshot_path,
+                    "url": url,
+                    "format": image["format"],
+                    "raw_size": image["raw_size"],
+                    "encoded_size": image["encoded_size"],
+                    "sha256": sha256,
+                    "timings": timings,
+                    "diagnostics": diagnostics,
+                    "timestamp": datetime.now().isoformat()
+                }
+                if blob:
+                    result["blob"] = blob
+                if include_data:
+                    result["data"] = image.get("data")
+                return result
             
         except Exception as error:
             error_msg = str(error)
@@ -233,22 +713,39 @@ class ScreenshotService:
             import traceback
             traceback.print_exc()
             
+            timings["total_ms"] = round((time.monotonic() - capture_start) * 1000)
             return {
                 "success": False,
                 "error": error_msg,
                 "url": url,
+                "timings": timings,
+                "diagnostics": diagnostics,
                 "timestamp": datetime.now().isoformat()
             }
-        finally:
-            # 清理资源
+    
+    async def iter_screenshots(self, urls: list, options: dict = None, concurrency: int = None,
+                               rate_limiter: HostRateLimiter = None):
+        """并发批量截图，按完成顺序产出 (索引, 结果)
+        
+        全局并发由 concurrency 限制，同一主机的请求由 rate_limiter 控制间隔。
+        """
+        limiter = rate_limiter or HostRateLimiter(self.config["host_min_interval"])
+        
+        async def capture(index, url):
             try:
-                if page:
-                    await page.close()
-                if context:
-                    await context.close()
-                if browser:
-                    await browser.close()
-                if playwright:
-                    await playwright.stop()
+                return await self.take_screenshot(url, options)
             except Exception as e:
-                print(f'资源清理异常: {e}')
\ No newline at end of file
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "url": url,
+                    "timestamp": datetime.now().isoformat()
+                }
+        
+        scheduled = iter_scheduled(urls, capture, limiter, concurrency or self.config["batch_concurrency"])
+        try:
+            async for index, result in scheduled:
+                yield index, result
+        finally:
+            # 调用方提前结束时立即取消未完成的截图
+            await scheduled.aclose()
@@ -108,16 +108,20 @@ async def test_screenshot_service():
         service = ScreenshotService("./screenshots")
         print("✅ 服务实例创建成功")
         
-        # 测试简单截图
-        print("\n📸 测试简单截图...")
-        result = await service.take_screenshot("https://httpbin.org/html")
-        
-        if result.get("success"):
-            print(f"✅ 截图成功: {result.get('filename')}")
-            return True
-        else:
-            print(f"❌ 截图失败: {result.get('error')}")
-            return False
+        try:
+            # 测试简单截图
+            print("\n📸 测试简单截图...")
+            result = await service.take_screenshot("https://httpbin.org/html")
+            
+            if result.get("success"):
+                print(f"✅ 截图成功: {result.get('filename')}")
+                return True
+            else:
+                print(f"❌ 截图失败: {result.get('error')}")
+                return False
+        finally:
+            # 关闭浏览器池，等待后台预览生成完成
+            await service.close()
             
     except Exception as e:
         print(f"❌ 服务测试失败: {e}")
@@ -15,6 +15,9 @@ def main():
     print("  GET  /health                    - 健康检查")
     print("  POST /screenshot                - 单个URL截图")
     print("  POST /screenshot/batch          - 批量URL截图")
+    print("  POST /screenshot/batch/stream   - 流式批量截图 (NDJSON/SSE)")
+    print("  POST /jobs                      - 提交异步截图任务")
+    print("  GET  /jobs/{job_id}             - 查询任务状态和结果")
     print("  GET  /screenshots               - 列出所有截图")
     print("\n按 Ctrl+C 停止服务\n")
     
@@ -0,0 +1,103 @@
+import json
+import os
+
+from screenshot_cache import ScreenshotCache
+
+# 默认目标清单（与本文件同目录）
+DEFAULT_TARGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "targets.json")
+
+class TargetRegistry:
+    """截图目标清单
+
+    所有批量脚本和测试脚本共用的网站列表，存放在 JSON 文件中，首次查询时才加载。
+    每个目标包含名称、URL、分类、标签、优先级和专属截图参数（options）；
+    加载时按规范化URL去重（重复条目的标签合并到第一条），并建立标签/分类索引。
+    """
+
+    def __init__(self, path: str = DEFAULT_TARGETS_PATH):
+        self.path = path
+        self._targets = None
+        self._by_url = {}
+        self._by_tag = {}
+        self._by_category = {}
+
+    def _ensure_loaded(self):
+        if self._targets is not None:
+            return
+        with open(self.path, encoding='utf-8') as f:
+            entries = json.load(f)["targets"]
+
+        targets = []
+        for entry in entries:
+            key = ScreenshotCache.normalize_url(entry["url"])
+            existing = self._by_url.get(key)
+            if existing is not None:
+                existing["tags"] += [tag for tag in entry.get("tags", []) if tag not in existing["tags"]]
+                continue
+            target = {
+                "name": entry["name"],
+                "url": entry["url"],
+                "category": entry.get("category"),
+                "tags": list(entry.get("tags", [])),
+                "priority": entry.get("priority", 0),
+                "options": entry.get("options", {}),
+                "note": entry.get("note")
+            }
+            self._by_url[key] = target
+            targets.append(target)
+
+        for index, target in enumerate(targets):
+            for tag in target["tags"]:
+                self._by_tag.setdefault(tag, []).append(index)
+            self._by_category.setdefault(target["category"], []).append(index)
+        self._targets = targets
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._targets)
+
+    def get(self, url: str) -> dict:
+        """按URL查找目标（规范化后比较），不存在时返回 None"""
+        self._ensure_loaded()
+        target = self._by_url.get(ScreenshotCache.normalize_url(url))
+        return dict(target) if target else None
+
+    def tags(self) -> list:
+        self._ensure_loaded()
+        return list(self._by_tag)
+
+    def categories(self) -> list:
+        self._ensure_loaded()
+        return list(self._by_category)
+
+    def query(self, tags: list = None, categories: list = None, by_priority: bool = False,
+              limit: int = None) -> list:
+        """按标签（任一匹配）和分类筛选目标
+
+        默认保持清单中的顺序；by_priority 为 True 时按优先级从高到低排列（同优先级保持原顺序）。
+        """
+        self._ensure_loaded()
+        indexes = None
+        if tags:
+            indexes = {i for tag in tags for i in self._by_tag.get(tag, [])}
+        if categories:
+            matched = {i for category in categories for i in self._by_category.get(category, [])}
+            indexes = matched if indexes is None else indexes & matched
+
+        selected = range(len(self._targets)) if indexes is None else sorted(indexes)
+        targets = [self._targets[i] for i in selected]
+        if by_priority:
+            targets.sort(key=lambda target: -target["priority"])
+        if limit is not None:
+            targets = targets[:limit]
+        # 返回副本，调用方修改不影响清单
+        return [dict(target, tags=list(target["tags"]), options=dict(target["options"])) for target in targets]
+
+_default_registry = None
+
+def default_registry() -> TargetRegistry:
+    """进程内共享的默认清单，只加载一次"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = TargetRegistry()
+    return _default_registry
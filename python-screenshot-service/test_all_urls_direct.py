@@ -12,56 +12,10 @@ from datetime import datetime
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# 从12文件夹中提取的所有44个URL
-ALL_URLS = [
-    # Python文件中的URL
-    {"name": "Wave Life Sciences", "url": "https://wavelifesciences.com/pipeline/research-and-development/"},
-    {"name": "Silence Therapeutics", "url": "https://silence-therapeutics.com/our-pipeline/default.aspx"},
-    
-    # JavaScript文件中的URL
-    {"name": "Alnylam", "url": "https://www.alnylam.com/alnylam-rnai-pipeline"},
-    {"name": "Arrowhead Pharma", "url": "https://arrowheadpharma.com/pipeline/"},
-    {"name": "Ionis", "url": "https://ionis.com/pipeline/independent?_format=json"},
-    {"name": "Avidity Biosciences", "url": "https://www.aviditybiosciences.com/pipeline/pipeline-overview"},
-    {"name": "Lilly", "url": "https://www.lilly.com/innovation/clinical-development-pipeline"},
-    {"name": "Novo Nordisk", "url": "https://www.novonordisk.com/science-and-technology/r-d-pipeline.html"},
-    {"name": "Novartis", "url": "https://www.novartis.com/research-development/novartis-pipeline"},
-    {"name": "Regeneron", "url": "https://www.regeneron.com/science/investigational-pipeline"},
-    {"name": "Dyne Therapeutics", "url": "https://www.dyne-tx.com/pipeline/"},
-    {"name": "Denali Therapeutics", "url": "https://www.denalitherapeutics.com/pipeline"},
-    {"name": "Adarx", "url": "https://www.adarx.com/pipeline/"},
-    {"name": "Ribolia", "url": "https://www.ribolia.com/pipeline"},
-    {"name": "Intellia Therapeutics", "url": "https://www.intelliatx.com/pipeline/"},
-    {"name": "Beam Therapeutics", "url": "https://beamtx.com/pipeline/"},
-    {"name": "AstraZeneca", "url": "https://www.astrazeneca.com/our-therapy-areas/pipeline.html"},
-    {"name": "Roche", "url": "https://www.roche.com/solutions/pipeline"},
-    {"name": "Atalanta Therapeutics", "url": "https://www.atalantatx.com/pipeline/"},
-    {"name": "Sarepta", "url": "https://www.sarepta.com/products-pipeline/pipelinel"},
-    {"name": "Rona Therapeutics", "url": "https://www.ronatherapeutics.com/pipeline"},
-    {"name": "CRISPR Therapeutics", "url": "https://crisprtx.com/pipeline"},
-    {"name": "Olix Pharma", "url": "https://olixpharma.com/rnd/rnd03.php"},
-    {"name": "Entrada Therapeutics", "url": "https://www.entradatx.com/pipeline"},
-    {"name": "PepGen", "url": "https://www.pepgen.com/pipeline/"},
-    {"name": "Tangram Therapeutics", "url": "https://tangramtx.com/pipeline/"},
-    {"name": "Switch Therapeutics", "url": "https://www.switchthera.com/our-science/"},
-    {"name": "Arobic Therapeutics", "url": "https://www.arobiotx.com/pipeline"},
-    {"name": "SiRNA Omics", "url": "https://www.sirnaomics.com/cn/science-pipeline/pipeline/"},
-    {"name": "Sanegene Bio", "url": "https://www.sanegenebio.com/pipeline/"},
-    {"name": "Sirius RNA", "url": "https://www.siriusrna.com/pipeline/index.html#pipeline"},
-    {"name": "Synerk", "url": "https://synerk.cn/productinfo/883480.html"},
-    {"name": "Aligos", "url": "https://aligos.com/science/scientific-overview/"},
-    {"name": "Arbutus Bio", "url": "https://www.arbutusbio.com/pipeline/"},
-    {"name": "ProQR", "url": "https://www.proqr.com/pipeline"},
-    {"name": "Metagenomi", "url": "https://metagenomi.co/pipeline"},
-    {"name": "Camp4 Therapeutics", "url": "https://www.camp4tx.com/pipeline/"},
-    {"name": "Mina Therapeutics", "url": "https://minatx.com/pipeline/"},
-    {"name": "Ractigen", "url": "https://www.ractigen.com/pipeline/"},
-    {"name": "Judo Bio", "url": "https://judo.bio/pipeline/"},
-    {"name": "Rigerna", "url": "https://www.rigerna.com/page/cpgx/"},
-    {"name": "Siran Bio", "url": "https://www.siranbio.com/page/cpgx/"},
-    {"name": "VisiRNA", "url": "https://www.visirna.com/pages/client/pplinea?version=v1"},
-    {"name": "Hygeia Pharma", "url": "https://www.hygieiapharma.com/Pipeline/3.html"}
-]
+from target_registry import default_registry
+
+# 12文件夹中的所有44个URL（目标清单中标记为 folder_12 的网站）
+ALL_URLS = default_registry().query(tags=["folder_12"])
 
 async def test_single_url(service, url_info, index, total):
     """测试单个URL"""
@@ -122,12 +76,13 @@ async def test_all_urls():
         service = ScreenshotService("./screenshots")
         print("✅ 截图服务实例创建成功")
         
-        # 先测试简单URL验证服务正常
+        # 先用就绪探针验证服务正常（同时预热浏览器池）
         print("\n🧪 验证服务正常...")
-        simple_result = await service.take_screenshot("https://httpbin.org/html")
+        probe = await service.probe()
         
-        if not simple_result.get("success"):
-            print(f"❌ 服务验证失败: {simple_result.get('error')}")
+        if not probe.get("success"):
+            print(f"❌ 服务验证失败: {probe.get('error')}")
+            await service.close()
             return
         
         print("✅ 服务验证成功，开始批量测试\n")
@@ -143,33 +98,37 @@ async def test_all_urls():
     results = []
     batch_size = 5  # 每批处理5个
     
-    for i in range(0, len(ALL_URLS), batch_size):
-        batch = ALL_URLS[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        total_batches = (len(ALL_URLS) + batch_size - 1) // batch_size
-        
-        print(f"\n📦 批次 {batch_num}/{total_batches}: 处理 {len(batch)} 个URL")
-        print("-" * 60)
-        
-        batch_start = time.time()
-        
-        for j, url_info in enumerate(batch):
-            result = await test_single_url(service, url_info, i + j + 1, len(ALL_URLS))
-            results.append(result)
+    try:
+        for i in range(0, len(ALL_URLS), batch_size):
+            batch = ALL_URLS[i:i + batch_size]
+            batch_num = i // batch_size + 1
+            total_batches = (len(ALL_URLS) + batch_size - 1) // batch_size
             
-            # 每个URL之间等待1秒
-            if j < len(batch) - 1:
-                await asyncio.sleep(1)
-        
-        batch_elapsed = time.time() - batch_start
-        success_in_batch = sum(1 for r in batch if results[i + batch.index(r)].get("success"))
-        
-        print(f"\n📊 批次 {batch_num} 完成: {success_in_batch}/{len(batch)} 成功 ({batch_elapsed:.1f}s)")
-        
-        # 批次间等待3秒
-        if i + batch_size < len(ALL_URLS):
-            print("⏳ 批次间等待 3 秒...\n")
-            await asyncio.sleep(3)
+            print(f"\n📦 批次 {batch_num}/{total_batches}: 处理 {len(batch)} 个URL")
+            print("-" * 60)
+            
+            batch_start = time.time()
+            
+            for j, url_info in enumerate(batch):
+                result = await test_single_url(service, url_info, i + j + 1, len(ALL_URLS))
+                results.append(result)
+                
+                # 每个URL之间等待1秒
+                if j < len(batch) - 1:
+                    await asyncio.sleep(1)
+            
+            batch_elapsed = time.time() - batch_start
+            success_in_batch = sum(1 for r in batch if results[i + batch.index(r)].get("success"))
+            
+            print(f"\n📊 批次 {batch_num} 完成: {success_in_batch}/{len(batch)} 成功 ({batch_elapsed:.1f}s)")
+            
+            # 批次间等待3秒
+            if i + batch_size < len(ALL_URLS):
+                print("⏳ 批次间等待 3 秒...\n")
+                await asyncio.sleep(3)
+    finally:
+        # 关闭浏览器池，等待后台预览生成完成
+        await service.close()
     
     # 生成最终报告
     generate_final_report(results)
@@ -8,49 +8,12 @@ import json
 import time
 from datetime import datetime
 
+from target_registry import default_registry
+
 API_BASE = "http://localhost:8000"
 
-# 重点测试的URL（从12文件夹中提取的关键网站）
-KEY_URLS = [
-    # Python代码中成功抓取的
-    {
-        "url": "https://wavelifesciences.com/pipeline/research-and-development/",
-        "name": "Wave Life Sciences",
-        "note": "Python代码中成功抓取数据的网站"
-    },
-    {
-        "url": "https://silence-therapeutics.com/our-pipeline/default.aspx",
-        "name": "Silence Therapeutics", 
-        "note": "可能有Cloudflare保护"
-    },
-    
-    # 常见的制药公司管线页面
-    {
-        "url": "https://www.alnylam.com/alnylam-rnai-pipeline",
-        "name": "Alnylam",
-        "note": "RNAi领域知名公司"
-    },
-    {
-        "url": "https://arrowheadpharma.com/pipeline/",
-        "name": "Arrowhead Pharma",
-        "note": "RNAi治疗公司"
-    },
-    {
-        "url": "https://www.intelliatx.com/pipeline/",
-        "name": "Intellia Therapeutics",
-        "note": "CRISPR基因编辑公司"
-    },
-    {
-        "url": "https://crisprtx.com/pipeline",
-        "name": "CRISPR Therapeutics",
-        "note": "CRISPR基因编辑公司"
-    },
-    {
-        "url": "https://www.sarepta.com/products-pipeline/pipelinel",
-        "name": "Sarepta Therapeutics",
-        "note": "可能有反爬保护"
-    }
-]
+# 重点测试的URL（目标清单中标记为 protected 的网站）
+KEY_URLS = default_registry().query(tags=["protected"], by_priority=True)
 
 async def check_service():
     """检查服务是否启动"""
@@ -77,7 +40,7 @@ async def test_url(session, url_info, index, total):
     """测试单个URL"""
     url = url_info["url"]
     name = url_info["name"]
-    note = url_info.get("note", "")
+    note = url_info.get("note") or ""
     
     print(f"[{index}/{total}] 📸 {name}")
     print(f"         URL: {url}")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 截图缓存跨服务实例共享（不启动浏览器，不访问网络）
+"""
+import asyncio
+import base64
+import os
+import tempfile
+
+from screenshot_service import ScreenshotService
+
+TEST_URL = "https://example.com/pipeline"
+
+# 1×1 像素的 PNG
+TEST_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+async def check_shared_cache_hit():
+    """两个截图目录不同的服务实例（如两次运行的批量脚本）共用缓存"""
+    print("📸 缓存跨实例共享测试...")
+    first = ScreenshotService(os.path.join("screenshots", "quick_first", "images"))
+    second = ScreenshotService(os.path.join("screenshots", "quick_second", "images"))
+    try:
+        assert first.cache.cache_dir == second.cache.cache_dir
+
+        # 第一个实例写入一张截图并放入缓存
+        path = os.path.join(first.screenshot_dir, "example_com.png")
+        with open(path, 'wb') as f:
+            f.write(TEST_PNG)
+        key = first.cache.make_key(TEST_URL, first.render_signature({}))
+        previews = first.previews.paths_for("0" * 64)
+        await first.cache.put(key, TEST_URL, path, "0" * 64, previews)
+
+        # 第二个实例直接命中，不启动浏览器
+        result = await second.take_screenshot(TEST_URL, {})
+        assert result["success"] and result.get("cached"), result
+        assert not second.browser_pool.started
+        # 内容哈希和预览路径来自缓存条目，命中时不重新读取文件
+        assert result["sha256"] == "0" * 64 and result["thumbnail"] == previews["thumbnail"]
+        assert not second._preview_tasks
+        print(f"✅ 缓存命中: {result['path']}")
+        return True
+    finally:
+        await first.close()
+        await second.close()
+
+def test_shared_cache_hit():
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            assert asyncio.run(check_shared_cache_hit())
+        finally:
+            os.chdir(cwd)
+
+if __name__ == "__main__":
+    test_shared_cache_hit()
+    print("\n🎉 所有测试完成！")
@@ -8,58 +8,12 @@ import json
 import time
 from datetime import datetime
 
+from target_registry import default_registry
+
 API_BASE = "http://localhost:8000"
 
-# 从12文件夹代码中提取的所有URL
-URLS_TO_TEST = [
-    # Python文件中的URL
-    "https://wavelifesciences.com/pipeline/research-and-development/",
-    "https://silence-therapeutics.com/our-pipeline/default.aspx",
-    
-    # JavaScript文件中的URL
-    "https://www.alnylam.com/alnylam-rnai-pipeline",
-    "https://arrowheadpharma.com/pipeline/",
-    "https://ionis.com/pipeline/independent?_format=json",
-    "https://www.aviditybiosciences.com/pipeline/pipeline-overview",
-    "https://www.lilly.com/innovation/clinical-development-pipeline",
-    "https://www.novonordisk.com/science-and-technology/r-d-pipeline.html",
-    "https://www.novartis.com/research-development/novartis-pipeline",
-    "https://www.regeneron.com/science/investigational-pipeline",
-    "https://www.dyne-tx.com/pipeline/",
-    "https://www.denalitherapeutics.com/pipeline",
-    "https://www.adarx.com/pipeline/",
-    "https://www.ribolia.com/pipeline",
-    "https://www.intelliatx.com/pipeline/",
-    "https://beamtx.com/pipeline/",
-    "https://www.astrazeneca.com/our-therapy-areas/pipeline.html",
-    "https://www.roche.com/solutions/pipeline",
-    "https://www.atalantatx.com/pipeline/",
-    "https://www.sarepta.com/products-pipeline/pipelinel",
-    "https://www.ronatherapeutics.com/pipeline",
-    "https://crisprtx.com/pipeline",
-    "https://olixpharma.com/rnd/rnd03.php",
-    "https://www.entradatx.com/pipeline",
-    "https://www.pepgen.com/pipeline/",
-    "https://tangramtx.com/pipeline/",
-    "https://www.switchthera.com/our-science/",
-    "https://www.arobiotx.com/pipeline",
-    "https://www.sirnaomics.com/cn/science-pipeline/pipeline/",
-    "https://www.sanegenebio.com/pipeline/",
-    "https://www.siriusrna.com/pipeline/index.html#pipeline",
-    "https://synerk.cn/productinfo/883480.html",
-    "https://aligos.com/science/scientific-overview/",
-    "https://www.arbutusbio.com/pipeline/",
-    "https://www.proqr.com/pipeline",
-    "https://metagenomi.co/pipeline",
-    "https://www.camp4tx.com/pipeline/",
-    "https://minatx.com/pipeline/",
-    "https://www.ractigen.com/pipeline/",
-    "https://judo.bio/pipeline/",
-    "https://www.rigerna.com/page/cpgx/",
-    "https://www.siranbio.com/page/cpgx/",
-    "https://www.visirna.com/pages/client/pplinea?version=v1",
-    "https://www.hygieiapharma.com/Pipeline/3.html"
-]
+# 12文件夹中的所有URL（目标清单中标记为 folder_12 的网站）
+URLS_TO_TEST = [target["url"] for target in default_registry().query(tags=["folder_12"])]
 
 async def check_service():
     """检查服务是否启动"""
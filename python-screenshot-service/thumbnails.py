@@ -0,0 +1,119 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from image_encoding import Image
+from screenshot_catalog import sha256_file
+
+# 缩略图固定尺寸（从页面顶部按宽度缩放后裁剪）
+THUMBNAIL_SIZE = (320, 240)
+# 首屏预览宽度
+PREVIEW_WIDTH = 960
+
+def _render_previews(source_path: str, thumb_path: str, preview_path: str,
+                     thumb_size: tuple, preview_width: int, fold_height: int):
+    """在子进程中生成缩略图和首屏预览（CPU 密集）"""
+    # 整页截图可能远超默认的像素上限
+    Image.MAX_IMAGE_PIXELS = None
+    with Image.open(source_path) as image:
+        image = image.convert("RGB")
+        width, height = image.size
+
+        # 首屏：截取第一个视口高度
+        fold = image.crop((0, 0, width, min(height, fold_height)))
+        preview_height = max(1, round(fold.height * preview_width / width))
+        fold.resize((preview_width, preview_height), Image.LANCZOS).save(
+            preview_path + ".tmp", format="JPEG", quality=82, optimize=True
+        )
+
+        # 缩略图：按宽度缩放，从顶部裁剪为固定尺寸，不足部分补白
+        thumb_width, thumb_height = thumb_size
+        source_height = min(height, round(thumb_height * width / thumb_width))
+        thumb = image.crop((0, 0, width, source_height)).resize(
+            (thumb_width, max(1, round(source_height * thumb_width / width))), Image.LANCZOS
+        )
+        canvas = Image.new("RGB", thumb_size, "white")
+        canvas.paste(thumb, (0, 0))
+        canvas.save(thumb_path + ".tmp", format="JPEG", quality=80, optimize=True)
+
+    os.replace(preview_path + ".tmp", preview_path)
+    os.replace(thumb_path + ".tmp", thumb_path)
+
+class PreviewGenerator:
+    """截图缩略图与首屏预览
+
+    在独立的进程池中生成，不占用截图流程和事件循环；结果按截图内容的 SHA-256
+    存放在 output_dir/<哈希前两位>/ 下，内容相同的截图只生成一次。
+    """
+
+    def __init__(self, output_dir: str, workers: int = 2, fold_height: int = 1080):
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        self.fold_height = fold_height
+        self._executor = None
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def paths_for(self, sha256: str) -> dict:
+        """内容哈希对应的缩略图和预览路径（文件不一定已生成）"""
+        shard_dir = os.path.join(self.output_dir, sha256[:2])
+        return {
+            "thumbnail": os.path.join(shard_dir, f"{sha256}_thumb.jpg"),
+            "preview": os.path.join(shard_dir, f"{sha256}_preview.jpg")
+        }
+
+    async def generate(self, source_path: str, sha256: str = None) -> dict:
+        """生成（或复用已有的）缩略图和预览，返回两者路径"""
+        if not self.available:
+            raise RuntimeError("生成缩略图需要安装 Pillow")
+        if sha256 is None:
+            sha256 = await asyncio.to_thread(sha256_file, source_path)
+
+        paths = self.paths_for(sha256)
+        if await asyncio.to_thread(self.exists, paths):
+            return paths
+
+        await asyncio.to_thread(os.makedirs, os.path.dirname(paths["thumbnail"]), exist_ok=True)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, _render_previews, source_path, paths["thumbnail"], paths["preview"],
+            THUMBNAIL_SIZE, PREVIEW_WIDTH, self.fold_height
+        )
+        return paths
+
+    @staticmethod
+    def exists(paths: dict) -> bool:
+        # 预览先于缩略图写入，缩略图存在即两者都已生成
+        return os.path.exists(paths["thumbnail"])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+async def drop_missing_previews(results: list):
+    """去掉未能生成的缩略图/预览路径（在线程池中检查文件），报告中不出现失效图片"""
+    def check():
+        for result in results:
+            if result.get("thumbnail") and not os.path.exists(result["thumbnail"]):
+                result["thumbnail"] = result["preview"] = None
+    await asyncio.to_thread(check)
+
+def report_thumbnail_html(result: dict, report_dir: str) -> str:
+    """HTML 报告中的缩略图：点击打开首屏预览，旁边附原图链接（路径相对报告所在目录）
+
+    增量报告中的行可能先于缩略图写出，图片暂不存在时隐藏，生成后刷新即可看到。
+    """
+    thumbnail = result.get("thumbnail")
+    if not thumbnail:
+        return ''
+    thumb_href = os.path.relpath(thumbnail, report_dir)
+    preview_href = os.path.relpath(result["preview"], report_dir)
+    full_href = os.path.relpath(result["path"], report_dir)
+    return (
+        f'<a href="{preview_href}" target="_blank"><img class="thumbnail" src="{thumb_href}" loading="lazy" alt="预览" onerror="this.hidden = true"></a>'
+        f'<a class="full-link" href="{full_href}" target="_blank">原图</a>'
+    )
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import struct
+import zlib
+from io import BytesIO
+
+from async_io import write_bytes
+from image_encoding import IMAGE_FORMATS, Image, encode_image
+
+# 页面总高度
+PAGE_HEIGHT_SCRIPT = "() => Math.max(document.body ? document.body.scrollHeight : 0, document.documentElement.scrollHeight)"
+
+class StreamingPNGWriter:
+    """逐行写入的 PNG 编码器
+
+    只需预先知道宽高，像素按行追加并经 zlib 流式压缩写盘，
+    内存中只保留当前一块图块的数据，与图片总高度无关。
+    """
+
+    # 每个 IDAT 块的大小
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, path: str, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._file = open(path, 'wb')
+        self._compressor = zlib.compressobj(6)
+        self._pending = bytearray()
+
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        # 8 位 RGB，非隔行
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+    def _flush_pending(self, force: bool = False):
+        while len(self._pending) >= self.CHUNK_SIZE or (force and self._pending):
+            chunk = bytes(self._pending[:self.CHUNK_SIZE])
+            del self._pending[:self.CHUNK_SIZE]
+            self._write_chunk(b'IDAT', chunk)
+
+    def write_rows(self, rgb: bytes, rows: int):
+        """追加 rows 行 RGB 像素（每行 width * 3 字节）"""
+        rows = min(rows, self.height - self.rows_written)
+        stride = self.width * 3
+        for row in range(rows):
+            # 每行前加过滤类型 0（None）
+            self._pending += self._compressor.compress(b'\x00' + rgb[row * stride:(row + 1) * stride])
+        self.rows_written += rows
+        self._flush_pending()
+
+    def close(self):
+        # 高度不足时补白色行，保证文件合法
+        if self.rows_written < self.height:
+            blank = b'\xff' * (self.width * 3)
+            for _ in range(self.height - self.rows_written):
+                self._pending += self._compressor.compress(b'\x00' + blank)
+            self.rows_written = self.height
+        self._pending += self._compressor.flush()
+        self._flush_pending(force=True)
+        self._write_chunk(b'IEND', b'')
+        self._file.close()
+
+def _tile_to_rgb(png_bytes: bytes, width: int) -> tuple:
+    """解码单个图块为 RGB 像素，返回 (像素, 行数)"""
+    with Image.open(BytesIO(png_bytes)) as tile:
+        tile = tile.convert("RGB")
+        if tile.width != width:
+            tile = tile.crop((0, 0, width, tile.height))
+        return tile.tobytes(), tile.height
+
+async def capture_tiles(page, width: int, tile_height: int, total_height: int):
+    """按视口高度逐块截图，产出 (y, 高度, PNG 字节)
+
+    每块使用 full_page + clip 截取，浏览器只需光栅化当前块，
+    渲染进程内存不随页面高度增长。
+    """
+    y = 0
+    while y < total_height:
+        height = min(tile_height, total_height - y)
+        data = await page.screenshot(
+            type="png",
+            full_page=True,
+            animations="disabled",
+            clip={"x": 0, "y": y, "width": width, "height": height}
+        )
+        yield y, height, data
+        y += height
+
+async def capture_tiled(page, output_dir: str, basename: str, width: int, tile_height: int,
+                        max_height: int = None, mode: str = "stitch", fmt: str = "png", quality: int = 80) -> dict:
+    """分块截取超长页面
+
+    mode="stitch": 逐块解码并流式写入一张 PNG，峰值内存只有一块图块大小
+    mode="manifest": 每块单独保存为文件，并写出 manifest.json 描述各块位置
+    """
+    if Image is None:
+        raise RuntimeError("分块截图需要安装 Pillow")
+
+    page_height = await page.evaluate(PAGE_HEIGHT_SCRIPT)
+    total_height = max(1, min(page_height, max_height) if max_height else page_height)
+    raw_size = 0
+    tiles = []
+
+    if mode == "stitch":
+        path = os.path.join(output_dir, f"{basename}.png")
+        writer = await asyncio.to_thread(StreamingPNGWriter, path, width, total_height)
+        try:
+            async for y, height, data in capture_tiles(page, width, tile_height, total_height):
+                raw_size += len(data)
+                rgb, rows = await asyncio.to_thread(_tile_to_rgb, data, width)
+                await asyncio.to_thread(writer.write_rows, rgb, min(rows, height))
+                tiles.append({"y": y, "height": height})
+        finally:
+            await asyncio.to_thread(writer.close)
+        return {
+            "path": path,
+            "format": "png",
+            "tiles": len(tiles),
+            "height": total_height,
+            "raw_size": raw_size,
+            "encoded_size": await asyncio.to_thread(os.path.getsize, path)
+        }
+
+    tiles_dir = os.path.join(output_dir, f"{basename}_tiles")
+    await asyncio.to_thread(os.makedirs, tiles_dir, exist_ok=True)
+    ext = IMAGE_FORMATS[fmt]["ext"]
+    encoded_size = 0
+
+    async for y, height, data in capture_tiles(page, width, tile_height, total_height):
+        raw_size += len(data)
+        encoded = data if fmt == "png" else await asyncio.to_thread(encode_image, data, fmt, quality)
+        tile_name = f"tile_{len(tiles):04d}{ext}"
+        await write_bytes(os.path.join(tiles_dir, tile_name), encoded)
+        encoded_size += len(encoded)
+        tiles.append({"file": tile_name, "y": y, "height": height, "size": len(encoded)})
+
+    manifest = {
+        "width": width,
+        "height": total_height,
+        "tile_height": tile_height,
+        "format": fmt,
+        "tiles": tiles
+    }
+    manifest_path = os.path.join(tiles_dir, "manifest.json")
+    await write_bytes(manifest_path, json.dumps(manifest, indent=2).encode())
+    return {
+        "path": manifest_path,
+        "format": fmt,
+        "tiles": len(tiles),
+        "height": total_height,
+        "raw_size": raw_size,
+        "encoded_size": encoded_size
+    }
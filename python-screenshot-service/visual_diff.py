@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+截图视觉差异对比
+对齐同一URL的两次截图，找出变化区域，输出高亮差异图和包围框
+"""
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from image_encoding import IMAGE_FORMATS, Image
+
+try:
+    from PIL import ImageDraw
+except ImportError:
+    ImageDraw = None
+
+# 分析时的缩小倍数（1920px 宽 → 480px）
+DOWNSCALE = 4
+# 缩小后每个对比块的边长（对应原图 32px）
+TILE_SIZE = 8
+# 块内平均灰度差超过该值视为变化（0-255）
+TILE_THRESHOLD = 8
+# 差异图相对原图的比例
+DIFF_IMAGE_SCALE = 0.5
+
+# 截图文件名: <域名>_<毫秒时间戳>_<URL哈希>.<扩展名>
+CAPTURE_FILENAME = re.compile(r"^(?P<domain>.+?)_(?P<timestamp>\d{10,})_(?P<url_hash>[0-9a-f]{8})\.(?P<ext>\w+)$")
+
+def _load_gray(path: str, width: int = None):
+    """读取为缩小后的灰度数组，返回 (数组, 原图尺寸)"""
+    Image.MAX_IMAGE_PIXELS = None
+    with Image.open(path) as image:
+        size = image.size
+        target_width = width or max(1, size[0] // DOWNSCALE)
+        target_height = max(1, round(size[1] * target_width / size[0]))
+        gray = image.convert("L").resize((target_width, target_height), Image.BILINEAR)
+        return np.asarray(gray, dtype=np.int16), size
+
+def align_rows(previous, current):
+    """按行对齐两张图
+
+    行内容量化后作为序列做最长匹配（同文本 diff），页面中间插入/删除内容时
+    下方内容仍能对上。返回 current 每一行对应的 previous 行号（-1 表示新增行）
+    以及被删除的 previous 行数。
+    """
+    def row_keys(array):
+        quantized = (array >> 4).astype(np.uint8)
+        return [row.tobytes() for row in quantized]
+
+    matcher = SequenceMatcher(None, row_keys(previous), row_keys(current), autojunk=False)
+    mapping = np.full(current.shape[0], -1, dtype=np.int64)
+    removed_rows = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal" or (tag == "replace" and i2 - i1 == j2 - j1):
+            # 等长的替换段逐行对应，由像素比较判断变化程度
+            mapping[j1:j2] = np.arange(i1, i2)
+        elif tag in ("delete", "replace"):
+            removed_rows += max(0, (i2 - i1) - (j2 - j1))
+    return mapping, removed_rows
+
+def changed_tiles(previous, current, mapping):
+    """向量化逐块比较，返回变化块的布尔矩阵"""
+    aligned = np.zeros_like(current)
+    matched = mapping >= 0
+    aligned[matched] = previous[mapping[matched]]
+    diff = np.abs(current - aligned)
+    diff[~matched] = 255
+
+    height, width = diff.shape
+    rows = -(-height // TILE_SIZE)
+    cols = -(-width // TILE_SIZE)
+    padded = np.zeros((rows * TILE_SIZE, cols * TILE_SIZE), dtype=np.int16)
+    padded[:height, :width] = diff
+    scores = padded.reshape(rows, TILE_SIZE, cols, TILE_SIZE).mean(axis=(1, 3))
+    return scores > TILE_THRESHOLD
+
+def tile_regions(tiles) -> list:
+    """相邻（含对角）的变化块合并为区域，返回块坐标包围框 (行0, 列0, 行1, 列1)"""
+    remaining = set(zip(*np.nonzero(tiles)))
+    regions = []
+    while remaining:
+        stack = [remaining.pop()]
+        top, left = bottom, right = stack[0]
+        while stack:
+            row, col = stack.pop()
+            top, bottom = min(top, row), max(bottom, row)
+            left, right = min(left, col), max(right, col)
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    neighbor = (row + dr, col + dc)
+                    if neighbor in remaining:
+                        remaining.remove(neighbor)
+                        stack.append(neighbor)
+        regions.append((int(top), int(left), int(bottom), int(right)))
+    regions.sort()
+    return regions
+
+def _write_diff_image(current_path: str, boxes: list, output_path: str):
+    """在当前截图（按 DIFF_IMAGE_SCALE 缩小）上用半透明红色标出变化区域"""
+    with Image.open(current_path) as image:
+        width = max(1, round(image.width * DIFF_IMAGE_SCALE))
+        height = max(1, round(image.height * DIFF_IMAGE_SCALE))
+        canvas = image.convert("RGB").resize((width, height), Image.BILINEAR)
+
+    draw = ImageDraw.Draw(canvas)
+    for box in boxes:
+        x0 = round(box["x"] * DIFF_IMAGE_SCALE)
+        y0 = round(box["y"] * DIFF_IMAGE_SCALE)
+        x1 = min(width, x0 + max(1, round(box["width"] * DIFF_IMAGE_SCALE)))
+        y1 = min(height, y0 + max(1, round(box["height"] * DIFF_IMAGE_SCALE)))
+        region = canvas.crop((x0, y0, x1, y1))
+        canvas.paste(Image.blend(region, Image.new("RGB", region.size, (255, 0, 0)), 0.35), (x0, y0))
+        draw.rectangle([x0, y0, x1 - 1, y1 - 1], outline=(255, 0, 0), width=3)
+    canvas.save(output_path, format="PNG", optimize=True)
+
+def diff_pair(previous_path: str, current_path: str, output_path: str = None) -> dict:
+    """对比两次截图（CPU 密集，适合在进程池中调用）
+
+    返回变化比例、包围框（当前截图的像素坐标）和新增/删除的高度；
+    有变化且指定 output_path 时写出高亮差异图。
+    """
+    if np is None or Image is None:
+        raise RuntimeError("视觉差异对比需要安装 numpy 和 Pillow")
+
+    current, current_size = _load_gray(current_path)
+    # 宽度不同时按当前截图的宽度缩放上一次截图
+    previous, previous_size = _load_gray(previous_path, width=current.shape[1])
+
+    mapping, removed_rows = align_rows(previous, current)
+    tiles = changed_tiles(previous, current, mapping)
+
+    scale_x = current_size[0] / current.shape[1]
+    scale_y = current_size[1] / current.shape[0]
+    boxes = []
+    for top, left, bottom, right in tile_regions(tiles):
+        x = round(left * TILE_SIZE * scale_x)
+        y = round(top * TILE_SIZE * scale_y)
+        boxes.append({
+            "x": x,
+            "y": y,
+            "width": min(current_size[0], round((right + 1) * TILE_SIZE * scale_x)) - x,
+            "height": min(current_size[1], round((bottom + 1) * TILE_SIZE * scale_y)) - y
+        })
+
+    result = {
+        "previous": previous_path,
+        "current": current_path,
+        "previous_size": list(previous_size),
+        "current_size": list(current_size),
+        "changed": bool(boxes),
+        "changed_ratio": round(float(tiles.mean()), 4) if tiles.size else 0.0,
+        "added_height": round(int((mapping < 0).sum()) * scale_y),
+        "removed_height": round(removed_rows * scale_y),
+        "boxes": boxes,
+        "diff_image": None
+    }
+    if boxes and output_path:
+        _write_diff_image(current_path, boxes, output_path)
+        result["diff_image"] = output_path
+    return result
+
+def _diff_task(args) -> dict:
+    previous_path, current_path, output_path = args
+    try:
+        return diff_pair(previous_path, current_path, output_path)
+    except Exception as e:
+        return {"previous": previous_path, "current": current_path, "changed": None, "error": str(e)}
+
+def diff_pairs(pairs: list, output_dir: str, workers: int = None) -> list:
+    """在进程池中批量对比 [(上一次截图, 当前截图), ...]，差异图写入 output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [
+        (previous, current, os.path.join(output_dir, f"{os.path.splitext(os.path.basename(current))[0]}_diff.png"))
+        for previous, current in pairs
+    ]
+    if not tasks:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_diff_task, tasks))
+
+def session_captures(session_dir: str) -> dict:
+    """会话目录中的截图，按 (域名, URL哈希) 分组，同一URL取最新一张"""
+    extensions = {info["ext"] for info in IMAGE_FORMATS.values()}
+    captures = {}
+    for filename in os.listdir(session_dir):
+        match = CAPTURE_FILENAME.match(filename)
+        if not match or f".{match.group('ext').lower()}" not in extensions:
+            continue
+        key = (match.group("domain"), match.group("url_hash"))
+        timestamp = int(match.group("timestamp"))
+        if key not in captures or timestamp > captures[key][0]:
+            captures[key] = (timestamp, os.path.join(session_dir, filename))
+    return {key: path for key, (_, path) in captures.items()}
+
+def diff_sessions(previous_dir: str, current_dir: str, output_dir: str = None, workers: int = None) -> dict:
+    """对比两个会话目录中同一URL的截图"""
+    previous = session_captures(previous_dir)
+    current = session_captures(current_dir)
+    common = sorted(set(previous) & set(current))
+    output_dir = output_dir or os.path.join(current_dir, "diffs")
+
+    # 硬链接（变化检测判定未变化）或内容相同的文件无需对比
+    pairs = [
+        (previous[key], current[key]) for key in common
+        if not os.path.samefile(previous[key], current[key])
+    ]
+    results = diff_pairs(pairs, output_dir, workers)
+    return {
+        "previous_session": previous_dir,
+        "current_session": current_dir,
+        "compared": len(pairs),
+        "identical": len(common) - len(pairs),
+        "changed": sum(1 for r in results if r.get("changed")),
+        "only_in_previous": [previous[key] for key in sorted(set(previous) - set(current))],
+        "only_in_current": [current[key] for key in sorted(set(current) - set(previous))],
+        "results": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="对比两个截图会话目录中同一URL的截图")
+    parser.add_argument("previous", help="上一次的会话目录")
+    parser.add_argument("current", help="本次的会话目录")
+    parser.add_argument("--output", help="差异图输出目录（默认 <本次目录>/diffs）")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认 CPU 核数）")
+    args = parser.parse_args()
+
+    report = diff_sessions(args.previous, args.current, args.output, args.workers)
+    output_dir = args.output or os.path.join(args.current, "diffs")
+    report_file = os.path.join(output_dir, "diff_report.json")
+    os.makedirs(output_dir, exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"📊 对比 {report['compared']} 对截图，{report['changed']} 个有变化，{report['identical']} 个完全相同")
+    for result in report["results"]:
+        if result.get("error"):
+            print(f"   ❌ {os.path.basename(result['current'])} - {result['error']}")
+        elif result["changed"]:
+            print(f"   🔄 {os.path.basename(result['current'])}: {len(result['boxes'])} 处变化 "
+                  f"({result['changed_ratio'] * 100:.1f}%) -> {result['diff_image']}")
+    print(f"📄 报告: {report_file}")
+
+if __name__ == "__main__":
+    main()